@@ -91,6 +91,18 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+# Shared by the web and worker processes. Create the table with
+# `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'coachmate_cache',
+    }
+}
+
 AUTHENTICATION_BACKENDS = (
     'CoachMate.backend.EmailAuthBackend',
     'django.contrib.auth.backends.ModelBackend',
@@ -1,8 +1,11 @@
-import os, re, zipfile, errno, shutil
-from datetime import date, timedelta
+import io, os, zipfile
 import logging
 
+from django.db import transaction
+
 from teams.models import Swimmer, Event
+from teams import hytek, batch, schedule
+from teams.records import rebuild_personal_bests
 
 tmlogger = logging.getLogger('CoachMate.tm')
 tmlogger_roster = logging.getLogger('CoachMate.tm.roster')
@@ -15,57 +18,46 @@ class TeamManager(object):
     def __init__(self, *args, **kwargs):
         self.team = kwargs.pop('team')
         self.zip_file = kwargs.pop('zip_file', None)
-        user_folder = self.team.user.last_name + '_temp_files/'
+        self.progress = kwargs.pop('progress', None) # called with percent complete
         self.msg = []
 
-        self.tmp_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tmp/')
-        self.user_folder_path = os.path.join(self.tmp_path, user_folder)
-
-        # create user folder
-        try:
-            os.makedirs(self.user_folder_path)
-        except OSError as e:
-            tmlogger.exception(e)
-            if e.errno != errno.EEXIST:
-                raise
-
-    def __del__(self):
-        # delete user folder
-        if os.path.exists(self.user_folder_path):
-            shutil.rmtree(self.user_folder_path)
-
-    def unzip_file(self, file):
+    def set_progress(self, percent):
         """
-        Unzips the file generated by Team Manager and places the contents in temp/.
+        Reports how far through the import is if a progress callback was given.
         """
-        if 'Roster' in os.path.basename(file.name):
-            self.zip_extract_dir = os.path.join(self.user_folder_path, 'roster/')
-        elif 'Results' in os.path.basename(file.name):
-            self.zip_extract_dir = os.path.join(self.user_folder_path, 'results/')
-        else:
-            err = ('error', 'Invalid file')
-            self.msg.append(err)
-            return err
+        if self.progress:
+            self.progress(int(percent))
 
-        try:
-            os.makedirs(self.zip_extract_dir)
-        except OSError as e:
-            tmlogger.exception(e)
-            if e.errno != errno.EEXIST:
-                raise
+    def open_zip_file(self, file):
+        """
+        Opens the zip file generated by Team Manager without extracting it.
+        Returns None if the file isn't named as a roster or results file.
+        """
+        name = os.path.basename(file.name)
+        if 'Roster' not in name and 'Results' not in name:
+            self.msg.append(('error', 'Invalid file'))
+            return None
 
-        zip_ref = zipfile.ZipFile(file, 'r')
-        zip_ref.extractall(self.zip_extract_dir)
-        zip_ref.close()
+        return zipfile.ZipFile(file, 'r')
 
-        if '__MACOSX' in os.listdir(self.zip_extract_dir):
-            shutil.rmtree(os.path.join(self.zip_extract_dir, '__MACOSX'))
-            self.zip_extract_dir = os.path.join(
-                self.zip_extract_dir,
-                os.path.basename(self.zip_file.name[:-4])
-            )
+    def member_names(self, zip_ref, ext):
+        """
+        Returns the names of files in the zip file with the given extension.
+        Files added by macOS in __MACOSX/ are skipped.
+        """
+        return [
+            name for name in zip_ref.namelist()
+            if name.lower().endswith(ext) and not name.startswith('__MACOSX/')
+        ]
 
-        return None
+    def open_members(self, zip_ref, ext):
+        """
+        Yields each file in the zip file with the given extension as a text
+        stream.
+        """
+        for name in self.member_names(zip_ref, ext):
+            with zip_ref.open(name) as member:
+                yield io.TextIOWrapper(member, encoding='latin-1', newline=None)
 
     def load_roster(self, file=None):
         """
@@ -75,29 +67,19 @@ class TeamManager(object):
 
         if not file:
             file = self.zip_file
-        try:
-            m = self.unzip_file(file)
-            if m:
-                return self.msg
-        except OSError:
-            raise
-
-        # try .CL2 file first
-        for file in os.listdir(self.zip_extract_dir):
-            if file.endswith('.CL2'):
-                file_flag = True
-                file = os.path.join(self.zip_extract_dir, file)
-                with open(file, 'r') as f_cl2:
-                    self.parse_roster(f_cl2, '.cl2')
-
-        if not file_flag:
-            # look for .HY3 file if no .CL2 file exists
-            for file in os.listdir(self.zip_extract_dir):
-                if file.endswith('.HY3'):
+        zip_ref = self.open_zip_file(file)
+        if not zip_ref:
+            return self.msg
+        self.set_progress(10)
+
+        with zip_ref:
+            # try .CL2 file first, then look for .HY3 file if no .CL2 file exists
+            for ext in ['.cl2', '.hy3']:
+                for f in self.open_members(zip_ref, ext):
                     file_flag = True
-                    file = os.path.join(self.zip_extract_dir, file)
-                    with open(os.path.abspath(file), 'r') as f_hy3:
-                        self.parse_roster(f_hy3, '.hy3')
+                    self.parse_roster(f, ext)
+                if file_flag:
+                    break
 
         if not file_flag:
             # return error message if neither file exists
@@ -109,93 +91,75 @@ class TeamManager(object):
         """
         Uses the .CL2 or .HY3 file to create a roster of swimmers.
         """
-        allSwimmers = Swimmer.objects.values_list('f_name', 'l_name')
-        newRoster = []
-        line_count = 0
+        newRoster = set()
         error_flag = False
-        for line in file:
-            if line_count < 4 and ext == '.hy3':
-                line_count += 1
-                continue
-            elif line_count < 2 and ext == '.cl2':
-                line_count += 1
-                continue
-            elif line_count % 2 and ext == '.cl2':
-                line_count += 1
-                continue
-            elif re.search('^Z', line) and ext == '.cl2':
-                break
-            else:
-                line_count += 1
-                # capture regex from line
-                # capture groups: <---><LAST>, <FIRST><---><MONTH><DAY><YEAR><---><GENDER>
-                if ext == '.cl2':
-                    name_capture = "(?P<last>[a-zA-Z]+[-' ]?[a-zA-Z]*), (?P<first>[a-zA-Z]+)"
-                    gender_capture = '[^a-z^A-Z](?P<gender>[MF])[^a-z^A-Z]'
-                elif ext == '.hy3':
-                    name_capture = "(?P<last>[a-zA-Z]+([-\' ]?[a-zA-Z]+))(\s+)(?P<first>[a-zA-Z]+)"
-                    gender_capture = '([A-Z]+[\d]+)(?P<gender>[MF])'
-                bd_capture = '(?P<month>\d{2})(?P<day>\d{2})(?P<year>\d{4})'
-
-                # capture regex
-                swimmer_name = re.search(name_capture, line)
-                swimmer_birth_date = re.search(bd_capture, line)
-                swimmer_gender = re.search(gender_capture, line)
-
-                try:
-                    # try required capture groups
-                    first_name = swimmer_name.group('first')
-                    last_name = swimmer_name.group('last')
-                    gender = swimmer_gender.group('gender')
-                except AttributeError:
-                    error_flag = True
-                    tmlogger_roster.error('Error importing swimmer. Line: ' + line)
-                    self.msg.append(('error', 'Couldn\'t import swimmer(s)'))
-                    continue
-
-                try:
-                    # birthday may be left out
-                    birth_date = date(
-                        int(swimmer_birth_date.group('year')),
-                        int(swimmer_birth_date.group('month')),
-                        int(swimmer_birth_date.group('day'))
-                    )
-                except AttributeError:
-                    birth_date = None
-
-                # check if swimmer exists
-                new_swimmer = Swimmer.objects.filter(
-                    team=self.team).filter(
-                    l_name=last_name).filter(
-                    f_name=first_name).filter(
-                    gender=gender).filter(
-                    birth_date=birth_date)
-                if not new_swimmer.exists():
-                    # create new swimmer
-                    new_swimmer = Swimmer.objects.create(
-                        team=self.team,
-                        f_name=first_name,
-                        l_name=last_name,
-                        gender=gender,
-                        birth_date=birth_date,
-                    )
-                    new_swimmer.set_age()
-                newRoster.append((first_name, last_name))
 
-        toDelete = []
-        for person in allSwimmers:
-            if person not in newRoster:
-                toDelete.append(person)
-
-        for s in toDelete:
-            Swimmer.objects.filter(
-                f_name=s[0]).filter(
-                l_name=s[1]).delete()
+        # index the team's current swimmers once instead of querying per line
+        allSwimmers = list(Swimmer.objects.filter(team=self.team))
+        roster = {}
+        for swimmer in allSwimmers:
+            roster[(swimmer.l_name, swimmer.f_name, swimmer.gender, swimmer.birth_date)] = swimmer
+
+        new_swimmers = []
+        for record in hytek.iter_roster(file, ext):
+            if isinstance(record, hytek.ErrorRecord):
+                error_flag = True
+                tmlogger_roster.error('Error importing swimmer. Line: ' + record.line)
+                self.msg.append(('error', 'Couldn\'t import swimmer(s)'))
+                continue
 
+            key = (record.last, record.first, record.gender, record.birth_date)
+            if key not in roster:
+                # create new swimmer
+                new_swimmer = Swimmer(
+                    team=self.team,
+                    f_name=record.first,
+                    l_name=record.last,
+                    gender=record.gender,
+                    birth_date=record.birth_date,
+                )
+                new_swimmer.calculate_age()
+                roster[key] = new_swimmer
+                new_swimmers.append(new_swimmer)
+            newRoster.add((record.first, record.last))
+
+        with transaction.atomic():
+            Swimmer.objects.bulk_create(new_swimmers)
+            self.roster_diff = self.reconcile_roster(allSwimmers, newRoster, len(new_swimmers))
+
+        tmlogger_roster.debug('Roster diff: %(added)d added, %(kept)d kept, %(removed)d removed' % self.roster_diff)
         if error_flag is False:
             tmlogger.debug('Roster imported')
             self.msg.append(('success', 'Roster imported'))
 
+        return self.roster_diff
+
+    def reconcile_roster(self, swimmers, new_roster, added=0):
+        """
+        Deletes the team's swimmers that aren't on the new roster.
+
+        swimmers are the team's swimmers from before the import and new_roster is
+        the set of (first, last) names in the roster file. Returns a dict with the
+        number of swimmers added, kept, and removed.
+        """
+        current = {}
+        for swimmer in swimmers:
+            current.setdefault((swimmer.f_name, swimmer.l_name), []).append(swimmer.pk)
+
+        toDelete = []
+        for person in set(current) - new_roster:
+            toDelete.extend(current[person])
+
+        if toDelete:
+            schedule.invalidate_practices(set__swimmers__in=toDelete)
+            Swimmer.objects.filter(team=self.team).filter(pk__in=toDelete).delete()
+
+        return {
+            'added': added,
+            'kept': len(swimmers) - len(toDelete),
+            'removed': len(toDelete),
+        }
+
     def load_results(self, file=None):
         """
         Opens a .HY3 file and passes them to create a roster of swimmers.
@@ -204,20 +168,18 @@ class TeamManager(object):
 
         if not file:
             file = self.zip_file
-        try:
-            m = self.unzip_file(file)
-            if m:
-                return self.msg
-        except OSError:
-            raise
-
-        # look for .HY3 file
-        for file in os.listdir(self.zip_extract_dir):
-            if file.endswith('.HY3') or file.endswith('.hy3'):
+        zip_ref = self.open_zip_file(file)
+        if not zip_ref:
+            return self.msg
+        self.set_progress(10)
+
+        with zip_ref:
+            # look for .HY3 file
+            count = len(self.member_names(zip_ref, '.hy3'))
+            for i, f in enumerate(self.open_members(zip_ref, '.hy3')):
                 file_flag = True
-                file = os.path.join(self.zip_extract_dir, file)
-                with open(os.path.abspath(file), 'r') as f_hy3:
-                    self.parse_results(f_hy3)
+                self.parse_results(f)
+                self.set_progress(10 + 90 * (i + 1) / count)
 
         if not file_flag:
             # return error message if no .HY3 file exists
@@ -225,108 +187,113 @@ class TeamManager(object):
 
         return self.msg
 
+    def load_batch(self, files=None, workers=None):
+        """
+        Parses results from many meet zip files, or a zip file of zip files, in
+        parallel and creates the Event objects for all of them at once.
+        """
+        if not files:
+            files = [self.zip_file]
+
+        archives = []
+        for file in files:
+            file.seek(0)
+            archives.append((os.path.basename(file.name), file.read()))
+        self.set_progress(10)
+
+        try:
+            parsed = batch.parse_archives(archives, workers)
+        except zipfile.BadZipfile:
+            self.msg.append(('error', 'Invalid file'))
+            return self.msg
+        self.set_progress(70)
+
+        records = []
+        meets = 0
+        for name, meet_records, errors in parsed:
+            for error in errors:
+                tmlogger_results.error(error)
+                self.msg.append(('error', error))
+            if meet_records:
+                meets += 1
+                records.extend(meet_records)
+
+        error_flag = self.write_results(records)
+        if error_flag is False and meets:
+            tmlogger.debug('Results imported from %d meets' % meets)
+            self.msg.append(('success', 'Results imported from %d meet(s)' % meets))
+
+        return self.msg
+
     def parse_results(self, file):
         """
         Uses the  .HY3 file to create Event objects for swimmers from results.
         """
-        line_count = 0
-        error_flag = False
-        meet_date = None
-        swimmer = None
-        events = {
-            'A': 'free',
-            'B': 'back',
-            'C': 'breast',
-            'D': 'fly',
-            'E': 'im',
-        }
-
-        for line in file:
-            if line_count == 0:
-                line_count += 1
-                continue
-            elif line_count == 1:
-                line_count += 1
-                date_capture = '(?P<month>\d{2})(?P<day>\d{2})(?P<year>\d{4})'
-                meet_date = re.search(date_capture, line)
-
-                try:
-                    # try required capture groups
-                    month = int(meet_date.group('month'))
-                    day = int(meet_date.group('day'))
-                    year = int(meet_date.group('year'))
-                    meet_date = date(year,month,day)
-
-                except AttributeError:
-                    error_flag = True
-                    tmlogger_results.error('Error capturing meet date. Line: ' + line)
-                    self.msg.append(('error', 'Couldn\'t find meet date'))
-                    return
-
-            else:
-                line_count += 1
-
-                name_capture = "(D1[MF][\s]+[\d]+)(?P<last>[a-zA-Z]+([-\' ]?[a-zA-Z]+))(\s+)(?P<first>[a-zA-Z]+)"
-                swimmer_name = re.search(name_capture, line)
-
-                if swimmer_name:
-                    first_name = swimmer_name.group('first')
-                    last_name = swimmer_name.group('last')
-                    s = Swimmer.objects.filter(
-                        team=self.team).filter(
-                        l_name=last_name).filter(
-                        f_name=first_name)
-                    if s.exists():
-                        swimmer = s[0]
-                    else:
-                        swimmer = None
-
-                elif swimmer:
-                    event_capture = "([ABCDE][\d][MF][\s]+[\d]+[a-zA-Z]+([\s]+[MF]+)?[\s]+)(?P<dist>[\d]+)(?P<event>[ABCDE])"
-                    event = re.search(event_capture, line)
-                    if event:
-                        distance = event.group('dist')
-                        event = events[event.group('event')]
-                        event = distance + ' ' + event
-                        nextline = file.next()
-
-                        time_capture = "([ABCDE][\d][MFT][\s]+)(?P<time>[\d]+[.][\d]+)([Y ][RQ]?[\s]+)(?P<place>[\dX]+)"
-                        time_place = re.search(time_capture, nextline)
-                        try:
-                            time = float(time_place.group('time'))
-                            if time == 0.00:
-                                continue
-                            time = timedelta(seconds=time)
-                            try:
-                                place = int(time_place.group('place'))
-                            except ValueError:
-                                place = None
-
-                            results = Event.objects.filter(
-                                swimmer=swimmer,
-                                event=event,
-                                time=time,
-                                place=place,
-                                date=meet_date,
-                            )
-                            if not results.exists():
-                                result = Event.objects.create(
-                                    swimmer=swimmer,
-                                    event=event,
-                                    time=time,
-                                    place=place,
-                                    date=meet_date,
-                                )
-                                result.set_name()
-                                result.set_gender()
-                                result.team = swimmer.team
-                                result.save()
-
-                        except AttributeError:
-                            error_flag = True
-                            tmlogger_results.error(('Error importing event for %s %s. Line: ' + nextline) % (swimmer.f_name, swimmer.l_name))
-                            self.msg.append(('error', 'Couldn\'t import event for %s %s' % (swimmer.f_name, swimmer.l_name)))
+        try:
+            error_flag = self.write_results(hytek.iter_results(file))
+        except hytek.MeetDateError as e:
+            tmlogger_results.error('Error capturing meet date. Line: ' + e.args[0])
+            self.msg.append(('error', 'Couldn\'t find meet date'))
+            return
 
         if error_flag is False:
             tmlogger.debug('Results imported')
             self.msg.append(('success', 'Results imported'))
+
+    def write_results(self, records):
+        """
+        Creates Event objects for the team's swimmers from parsed result records
+        with a single bulk insert. Returns True if any records had errors.
+        """
+        error_flag = False
+
+        # index the team's swimmers and the results already saved for each meet
+        # date so duplicates are found without querying per swim
+        swimmers = {}
+        for swimmer in Swimmer.objects.filter(team=self.team):
+            swimmers.setdefault((swimmer.f_name, swimmer.l_name), swimmer)
+        meet_dates = set()
+        results = set()
+
+        new_events = []
+        for record in records:
+            swimmer = swimmers.get((record.first, record.last))
+            if not swimmer:
+                continue
+
+            if isinstance(record, hytek.ErrorRecord):
+                error_flag = True
+                tmlogger_results.error(('Error importing event for %s %s. Line: ' + record.line) % (swimmer.f_name, swimmer.l_name))
+                self.msg.append(('error', 'Couldn\'t import event for %s %s' % (swimmer.f_name, swimmer.l_name)))
+                continue
+
+            if record.date not in meet_dates:
+                meet_dates.add(record.date)
+                results.update(Event.objects.filter(
+                    swimmer__team=self.team).filter(
+                    date=record.date).order_by().values_list(
+                    'swimmer', 'event', 'time', 'place', 'date'))
+
+            result = (swimmer.id, record.event, record.time, record.place, record.date)
+            if result not in results:
+                results.add(result)
+                new_events.append(Event(
+                    swimmer=swimmer,
+                    team=self.team,
+                    name=swimmer.f_name + ' ' + swimmer.l_name,
+                    gender=swimmer.gender,
+                    event=record.event,
+                    time=record.time,
+                    place=record.place,
+                    date=record.date,
+                ))
+
+        # bulk inserts don't send signals, so the personal bests of the swimmers
+        # with new results are rebuilt here
+        with transaction.atomic():
+            Event.objects.bulk_create(new_events)
+            if new_events:
+                rebuild_personal_bests(set(e.swimmer_id for e in new_events))
+
+        tmlogger_results.debug('%d results created' % len(new_events))
+        return error_flag
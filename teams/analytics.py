@@ -0,0 +1,164 @@
+"""
+Team progress analytics.
+
+Every result of a team's swimmers is fetched with one query and aggregated with
+NumPy, grouped by swimmer and event, into each swimmer's best and season best
+times, how much their season best beats their best before the season, their
+drop from their first swim, their improvement rate, and where their best ranks
+among the team's swimmers of the same gender. Like the progress charts (see
+teams.progress), the analytics are cached under the version of the team's
+results, along with a hash of its swimmers' names and genders, so they're only
+recomputed once results are added or deleted or a swimmer is edited. Hashing
+the roster also catches roster imports, which update swimmers in bulk without
+sending signals.
+"""
+import hashlib
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from teams.models import Event, Swimmer, EVENT_CHOICE
+from teams.weeks import season_start
+
+ANALYTICS_CACHE_KEY = 'teams:analytics:%s:%s:%s:%s'
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24 # old versions aren't used again
+RATE_DAYS = 30 # improvement rates are in seconds per 30 days
+
+def group_min(values, groups, n, mask=None):
+    """
+    Returns the minimum value in each of n groups, inf for empty groups.
+    """
+    out = np.full(n, np.inf)
+    if mask is None:
+        np.minimum.at(out, groups, values)
+    else:
+        np.minimum.at(out, groups[mask], values[mask])
+    return out
+
+
+def group_slope(x, y, groups, n):
+    """
+    Returns the least squares slope of y against x in each of n groups, NaN
+    for groups without at least two different x values.
+    """
+    count = np.bincount(groups, minlength=n).astype(float)
+    sx = np.bincount(groups, x, minlength=n)
+    sy = np.bincount(groups, y, minlength=n)
+    sxx = np.bincount(groups, x * x, minlength=n)
+    sxy = np.bincount(groups, x * y, minlength=n)
+    denom = count * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denom > 0, (count * sxy - sx * sy) / denom, np.nan)
+
+
+def group_rank(values, keys):
+    """
+    Returns the rank of each value, 1 for the smallest, among the values with
+    the same key.
+    """
+    order = np.lexsort((values, keys))
+    sorted_keys = keys[order]
+    starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    positions = np.arange(len(order))
+    first = np.maximum.accumulate(np.where(starts, positions, 0))
+    ranks = np.empty(len(order), dtype=int)
+    ranks[order] = positions - first + 1
+    return ranks
+
+
+def compute_analytics(results, start):
+    """
+    Returns a list with a dict for each event in EVENT_CHOICE order that any
+    of the results are for, with the event, its name, the team's average drop,
+    and a row for each swimmer in the event ordered by gender and rank. The
+    season starts on the given date.
+    """
+    events = [event for event, name in EVENT_CHOICE]
+    # results without a date can't be placed in a season or on a trend, and
+    # times of 0 are unset (NT) times rather than swims
+    results = results.filter(date__isnull=False, time__gt=timedelta(0)).order_by()
+    rows = [r for r in results.values_list('swimmer_id', 'swimmer__f_name', 'swimmer__l_name',
+        'swimmer__gender', 'event', 'date', 'time') if r[4] in events]
+    if not rows:
+        return []
+
+    swimmer_ids = np.array([r[0] for r in rows])
+    event_index = np.array([events.index(r[4]) for r in rows])
+    days = np.array([r[5] for r in rows], dtype='datetime64[D]').astype(np.int64)
+    times = np.array([r[6].total_seconds() for r in rows])
+
+    # one group for each swimmer's event
+    group_keys, groups = np.unique(swimmer_ids * len(events) + event_index, return_inverse=True)
+    n = len(group_keys)
+    group_swimmers = group_keys // len(events)
+    group_events = group_keys % len(events)
+
+    season = days >= np.datetime64(start, 'D').astype(np.int64)
+    best = group_min(times, groups, n)
+    season_best = group_min(times, groups, n, season)
+    before_season = group_min(times, groups, n, ~season)
+
+    # each group's earliest result
+    order = np.lexsort((days, groups))
+    first_times = times[order][np.r_[True, groups[order][1:] != groups[order][:-1]]]
+
+    counts = np.bincount(groups, minlength=n)
+    drops = (first_times - best) / first_times * 100
+    rates = group_slope((days - days.min()).astype(float), times, groups, n) * RATE_DAYS
+    with np.errstate(invalid='ignore'):
+        deltas = season_best - before_season # inf - inf is NaN
+
+    swimmers = dict((r[0], (r[1], r[2], r[3])) for r in rows)
+    genders = np.array([swimmers[s][2] == 'F' for s in group_swimmers], dtype=int)
+    ranks = group_rank(best, group_events * 2 + genders)
+
+    def number(value):
+        return None if not np.isfinite(value) else float(value)
+
+    def duration(value):
+        return None if not np.isfinite(value) else timedelta(seconds=float(value))
+
+    analytics = []
+    names = dict(EVENT_CHOICE)
+    for e in np.unique(group_events):
+        in_event = np.flatnonzero(group_events == e)
+        in_event = in_event[np.lexsort((ranks[in_event], genders[in_event]))]
+        analytics.append({
+            'event': events[e],
+            'name': names[events[e]],
+            'avg_drop': float(drops[in_event].mean()),
+            'swimmers': [{
+                'swimmer_id': int(group_swimmers[i]),
+                'name': '%s %s' % swimmers[group_swimmers[i]][:2],
+                'gender': swimmers[group_swimmers[i]][2],
+                'results': int(counts[i]),
+                'rank': int(ranks[i]),
+                'best': duration(best[i]),
+                'season_best': duration(season_best[i]),
+                'delta': number(deltas[i]),
+                'drop': float(drops[i]),
+                'rate': number(rates[i]),
+            } for i in in_event],
+        })
+    return analytics
+
+
+def get_team_analytics(team, day=None):
+    """
+    Returns the analytics of a team's results (see compute_analytics) for the
+    season containing the given date, today if not given.
+    """
+    start = season_start(day or date.today())
+    results = Event.objects.filter(swimmer__team=team)
+    version = results.aggregate(count=Count('id'), last_id=Max('id'))
+    roster = Swimmer.objects.filter(team=team).order_by('id').values_list('id', 'f_name', 'l_name', 'gender')
+    roster = hashlib.md5(repr(list(roster)).encode('utf-8')).hexdigest()
+    key = ANALYTICS_CACHE_KEY % (team.id, '%s-%s' % (version['count'], version['last_id']), roster,
+        start.isoformat())
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = compute_analytics(results, start)
+        cache.set(key, analytics, ANALYTICS_CACHE_TIMEOUT)
+    return analytics
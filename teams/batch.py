@@ -0,0 +1,74 @@
+"""
+Parsing for batches of Team Manager results archives.
+
+Parsing doesn't touch the database, so each meet's archive is parsed in a
+separate process and the records are handed back to be written all at once.
+"""
+import io, zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from teams import hytek
+
+def is_member(name, ext):
+    """
+    Returns True if a zip file member has the given extension and wasn't added
+    by macOS in __MACOSX/.
+    """
+    return name.lower().endswith(ext) and not name.startswith('__MACOSX/')
+
+
+def expand_archives(archives):
+    """
+    Yields (name, data) for each zip file containing .HY3 files. Zip files
+    nested inside an archive, like a season of meets zipped together, are
+    yielded separately so they can be parsed in parallel.
+    """
+    for name, data in archives:
+        zip_ref = zipfile.ZipFile(io.BytesIO(data), 'r')
+        with zip_ref:
+            nested = [n for n in zip_ref.namelist() if is_member(n, '.zip')]
+            for member in nested:
+                for archive in expand_archives([(member, zip_ref.read(member))]):
+                    yield archive
+
+            if not nested or any(is_member(n, '.hy3') for n in zip_ref.namelist()):
+                yield name, data
+
+
+def parse_results_archive(archive):
+    """
+    Parses each .HY3 file in a zip file. Returns a tuple of the archive name, a
+    list of parsed records, and a list of error messages.
+    """
+    name, data = archive
+    records = []
+    errors = []
+    zip_ref = zipfile.ZipFile(io.BytesIO(data), 'r')
+    with zip_ref:
+        members = [n for n in zip_ref.namelist() if is_member(n, '.hy3')]
+        if not members:
+            errors.append('Couldn\'t find .HY3 file in %s' % name)
+
+        for member in members:
+            f = io.TextIOWrapper(zip_ref.open(member), encoding='latin-1', newline=None)
+            try:
+                records.extend(hytek.iter_results(f))
+            except hytek.MeetDateError:
+                errors.append('Couldn\'t find meet date in %s' % name)
+            finally:
+                f.close()
+
+    return name, records, errors
+
+
+def parse_archives(archives, workers=None):
+    """
+    Parses a list of (name, data) results archives using a pool of worker
+    processes. Returns a list of (name, records, errors) tuples in order.
+    """
+    archives = list(expand_archives(archives))
+    if workers == 1 or len(archives) < 2:
+        return [parse_results_archive(archive) for archive in archives]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_results_archive, archives))
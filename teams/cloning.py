@@ -0,0 +1,153 @@
+"""
+Copying practices to new dates.
+
+A practice, a week, or a whole training cycle can be used as a template and
+copied onto other days. Everything is copied with a bulk insert per table: the
+practices, their sets, the swimmers in each set, the reps, and the intervals,
+which are recalculated with the team's current training model and bases. Like
+the practice editor, a copy replaces any practice already on its day.
+"""
+from datetime import timedelta
+from functools import reduce
+import operator
+
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from teams.models import Interval, Practice, Rep, Set, TrainingMultiplier
+from teams import schedule
+from teams.functions import get_set_intervals
+from teams.weeks import get_or_create_range, monday_of
+
+def bulk_create_with_ids(model, objs):
+    """
+    Inserts objects with one query and sets their ids, which bulk_create only
+    does on some databases.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+
+    last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+    model.objects.bulk_create(objs)
+    ids = model.objects.filter(pk__gt=last_id).order_by('id').values_list('id', flat=True)
+    for obj, pk in zip(objs, ids):
+        obj.pk = pk
+    return objs
+
+
+def get_multipliers(team):
+    """
+    Returns the team's training multiplier for each focus.
+    """
+    multipliers = {}
+    for focus, multiplier in TrainingMultiplier.objects.filter(
+            training_model__team=team).values_list('focus', 'multiplier'):
+        try:
+            multipliers[focus] = float(multiplier)
+        except (TypeError, ValueError):
+            pass
+    return multipliers
+
+
+def clone_practices(team, copies):
+    """
+    Copies practices onto new days. copies is a list of (practice, week,
+    weekday) for each copy to make. Returns the new practices in the same
+    order.
+    """
+    copies = list(copies)
+    if not copies:
+        return []
+
+    sources = Practice.objects.filter(pk__in=set(p.id for p, _, _ in copies)).prefetch_related(
+        'set_set__swimmers', 'set_set__rep_set')
+    sources = dict((p.id, p) for p in sources)
+    multipliers = get_multipliers(team)
+
+    with transaction.atomic():
+        targets = [Q(week_id=week, weekday=weekday) for _, week, weekday in copies]
+        Practice.objects.filter(team=team).filter(reduce(operator.or_, targets)).delete()
+
+        practices = bulk_create_with_ids(Practice, [
+            Practice(team=team, week_id=week, weekday=weekday) for _, week, weekday in copies
+        ])
+
+        # (source set, new set) for every set copied
+        set_pairs = []
+        for (source, _, _), practice in zip(copies, practices):
+            for old in sources[source.id].set_set.all():
+                new = Set(practice_id=practice, group=old.group, focus=old.focus,
+                    repeats=old.repeats, order=old.order, pace=old.pace)
+                set_pairs.append((old, new))
+        bulk_create_with_ids(Set, [new for _, new in set_pairs])
+
+        Set.swimmers.through.objects.bulk_create([
+            Set.swimmers.through(set_id=new.id, swimmer_id=swimmer.id)
+            for old, new in set_pairs
+            for swimmer in old.swimmers.all()
+        ])
+
+        rep_lists = [
+            [Rep(set_id=new, num=rep.num, distance=rep.distance, stroke=rep.stroke,
+                rest=rep.rest, comments=rep.comments) for rep in old.rep_set.all()]
+            for old, new in set_pairs
+        ]
+        bulk_create_with_ids(Rep, [rep for reps in rep_lists for rep in reps])
+
+        intervals = []
+        team_bases = {}
+        for (old, new), reps in zip(set_pairs, rep_lists):
+            multiplier = multipliers.get(new.focus)
+            # like the practice editor, sets with rest instead of intervals get none
+            if multiplier and not any(rep.rest for rep in reps):
+                intervals.extend(get_set_intervals(new, reps, list(old.swimmers.all()), multiplier,
+                    team_bases))
+        Interval.objects.bulk_create(intervals)
+
+    # bulk inserts don't send signals
+    for week_id in set(week.id for _, week, _ in copies):
+        schedule.invalidate_schedule(team.id, week_id)
+
+    return practices
+
+
+def clone_practice(practice, week, weekday=None):
+    """
+    Copies a practice onto a day of the given week, the same weekday unless
+    another is given. Returns the new practice.
+    """
+    return clone_practices(practice.team, [(practice, week, weekday or practice.weekday)])[0]
+
+
+def clone_week(team, source, target):
+    """
+    Copies every practice of the team's source week onto the same days of the
+    target week. Returns the new practices.
+    """
+    practices = Practice.objects.filter(team=team, week_id=source).order_by('id')
+    return clone_practices(team, [(p, target, p.weekday) for p in practices])
+
+
+def clone_cycle(team, start, end, target, repeats=1):
+    """
+    Copies the team's practices in the weeks from the week containing start
+    through the week containing end onto the weeks starting with the week
+    containing target. The cycle is copied back to back the given number of
+    times. Missing weeks are created. Returns the new practices.
+    """
+    first = monday_of(start)
+    length = (monday_of(end) - first).days // 7 + 1
+    if length < 1 or repeats < 1:
+        return []
+
+    practices = list(Practice.objects.filter(team=team,
+        week_id__monday__range=(first, monday_of(end))).select_related('week_id').order_by('id'))
+
+    target_weeks = get_or_create_range(target, monday_of(target) + timedelta(weeks=length * repeats - 1))
+    copies = []
+    for n in range(repeats):
+        for p in practices:
+            offset = (p.week_id.monday - first).days // 7
+            copies.append((p, target_weeks[n * length + offset], p.weekday))
+
+    return clone_practices(team, copies)
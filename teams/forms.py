@@ -250,14 +250,13 @@ class SetForm(forms.ModelForm):
         setInstance = super(SetForm, self).save(commit=False)
         if self.practice:
             setInstance.practice_id = self.practice # associate practice
-            setInstance.save()
+        setInstance.save()
         self.save_m2m()
 
-        swimmers = Swimmer.objects.filter(team=self.team)
-        if setInstance.group == 'team' and swimmers.exists():
-            for swimmer in swimmers.iterator():
-                setInstance.swimmers.add(swimmer.id)
-        setInstance.save()
+        if setInstance.group == 'team':
+            # the whole roster is added with one insert
+            swimmers = Swimmer.objects.filter(team=self.team).order_by().values_list('id', flat=True)
+            setInstance.swimmers.add(*swimmers)
         return setInstance
 
 
@@ -281,6 +280,56 @@ class PracticeForm(forms.ModelForm):
         return practice
 
 
+class JumpToDateForm(forms.Form):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs):
+        super(JumpToDateForm, self).__init__(*args, **kwargs)
+        self.fields['date'].widget.attrs.update({
+            'placeholder': 'Go to date',
+            'class': 'form-control'
+        })
+
+
+class CopyWeeksForm(forms.Form):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    weeks = forms.IntegerField(min_value=1, max_value=52, initial=1)
+    repeats = forms.IntegerField(min_value=1, max_value=52, initial=1)
+
+    def __init__(self, *args, **kwargs):
+        super(CopyWeeksForm, self).__init__(*args, **kwargs)
+        self.fields['date'].label = 'Copy to week of'
+        self.fields['weeks'].label = 'Number of weeks to copy'
+        self.fields['repeats'].label = 'Times to repeat'
+        for field in self.fields.values():
+            field.widget.attrs.update({'class': 'form-control'})
+
+
+class RecalculateIntervalsForm(forms.Form):
+    MAX_DAYS = 366 # a season at a time
+
+    start = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs):
+        super(RecalculateIntervalsForm, self).__init__(*args, **kwargs)
+        self.fields['start'].label = 'First practice'
+        self.fields['end'].label = 'Last practice'
+        for field in self.fields.values():
+            field.widget.attrs.update({'class': 'form-control input-sm', 'title': field.label})
+
+    def clean(self):
+        cleaned_data = super(RecalculateIntervalsForm, self).clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+        if start and end:
+            if end < start:
+                self.add_error('end', 'ERROR: Last practice must be after the first')
+            elif (end - start).days >= self.MAX_DAYS:
+                self.add_error('end', 'ERROR: Recalculate at most a season at a time')
+        return cleaned_data
+
+
 class TrainingForm(forms.ModelForm):
     class Meta:
         model = TrainingModel
@@ -403,3 +452,21 @@ class UploadZipForm(forms.Form):
             msg = 'ERROR: File must be in ZIP format'
             self.add_error('zip_file', msg)
         return cleaned_data
+
+
+class BatchUploadForm(forms.Form):
+    zip_files = forms.FileField(widget=forms.ClearableFileInput(attrs={'multiple': True}))
+
+    def __init__(self, *args, **kwargs):
+        super(BatchUploadForm, self).__init__(*args, **kwargs)
+        self.fields['zip_files'].widget.attrs.update({
+            'class': 'form-control'
+        })
+
+    def clean(self):
+        cleaned_data = super(BatchUploadForm, self).clean()
+        for file in self.files.getlist('zip_files'):
+            if file.name[-4:].lower() != '.zip':
+                msg = 'ERROR: %s must be in ZIP format' % file.name
+                self.add_error('zip_files', msg)
+        return cleaned_data
@@ -1,58 +1,54 @@
 from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
+import numpy as np
+
+from django.db import transaction
 
 from teams.models import *
+from teams.records import get_team_bases, get_team_bests
+from teams import pace, schedule
+from teams.weeks import get_or_create_range, monday_of
 
 def check_present():
     """
     Finds the current week if one exists and sets the current flag to True.
-    All others are set to False.
+    All others are set to False. Only the weeks whose flag changes are updated.
     """
-    week_set = Week.objects.all()
-
-    if week_set.exists():
-        for week in week_set.iterator():
-            flag = False
-            for day in week.date_range():
-                if day == date.today():
-                    week.present = True
-                    week.save()
-                    flag = True
-
-            # Set current flag to false if week is not current
-            if not flag:
-                week.present = False
-                week.save()
-
-        return True
-    else:
+    if not Week.objects.exists():
         return False
 
+    current = get_current_weeks().values_list('id', flat=True)
+    Week.objects.filter(present=True).exclude(pk__in=list(current)).update(present=False)
+    Week.objects.filter(pk__in=list(current), present=False).update(present=True)
+    return True
+
+
+def get_current_weeks():
+    """
+    Returns a queryset of the weeks containing today, found with the index on
+    Monday's date.
+    """
+    today = date.today()
+    return Week.objects.filter(monday__gt=today - timedelta(days=7), monday__lte=today)
+
 
 def get_monday(week=None, n=None):
     """
     Returns the requested Monday.
     """
     day = week.monday if week else date.today()
+    monday = monday_of(day)
 
     # previous Monday
     if n is 0:
-        while day.weekday() is not 0:
-            day -= relativedelta(days=1)
-        return day - relativedelta(days=7)
+        return monday - timedelta(days=7)
 
     # next Monday
     elif n is 1:
-        while True:
-            day += relativedelta(days=1)
-            if day.weekday() is 0:
-                return day
+        return monday + timedelta(days=7)
 
     # this past Monday
     else:
-        while day.weekday() is not 0:
-            day -= relativedelta(days=1)
-        return day
+        return monday
 
 
 def clean_weekday(team, practice):
@@ -71,67 +67,56 @@ def clean_weekday(team, practice):
 def get_or_create_weeks(w_id):
     """
     Gets or creates the previous, current, and next weeks to be used on the
-    schedule.
+    schedule. The three weeks are fetched together and any missing weeks are
+    created in bulk (see teams.weeks).
     """
-    weeks = {
-        'current': None,
-        'previous': 0,
-        'next': 1,
+    current = None
+    if int(w_id) is not 0:
+        # get week with id w_id as 'current'
+        current = Week.objects.filter(id=w_id).first()
+
+    if current:
+        previous_week, _, next_week = get_or_create_range(
+            current.monday - timedelta(days=7), current.monday + timedelta(days=7))
+    else:
+        # w_id = 0 if requesting the present week
+        previous_week, current, next_week = get_or_create_range(
+            get_monday(None, 0), get_monday(None, 1))
+        if not current.present:
+            # the week changed since the flags were last set
+            check_present()
+            current.present = True
+
+    return {
+        'current': current,
+        'previous': previous_week,
+        'next': next_week,
     }
 
-    # loop through current, next, and previous weeks
-    for key in sorted(weeks):
-        flag = False
-
-        try:
-            # try database queries
-            if int(w_id) is 0 and 'current' in key:
-                # w_id = 0 if requesting the present week
-                flag = True
-                check_present() # check weeks for present
-                weeks[key] = Week.objects.get(present=True)
-            elif int(w_id) is not 0 and 'current' in key:
-                # get week with id w_id as 'current'
-                weeks[key] = Week.objects.get(id=w_id)
-            else:
-                # get next and previous weeks (for next/previous buttons)
-                weeks[key] = weeks['current'].get_week(weeks[key])
-
-        except Week.DoesNotExist:
-            # else create week
-            if not flag: # return date of necessary Monday
-                monday = get_monday(weeks['current'], weeks[key])
-            else:
-                monday = get_monday(weeks[key])
-            weeks[key] = Week.objects.create(monday=monday, present=flag)
-            weeks[key].populate() # populate dates for rest of week
-
-    return weeks
-
-
-def get_zipped_set(setInstance):
+
+def get_zipped_set(setInstance, intervals=None):
     """
     Returns a list of tuples that represents a set in the
-    (Swimmer, (Rep, Interval)) format
+    (Swimmer, (Rep, Interval)) format. Intervals can be passed in as a dict keyed
+    by (rep id, swimmer id), otherwise the set's intervals are fetched in one
+    query.
     """
+    if intervals is None:
+        intervals = dict(((i.rep_id, i.swimmer_id), i) for i in
+            Interval.objects.filter(rep__set_id=setInstance))
+
+    reps = list(setInstance.rep_set.all())
     swimmers = []
     swimmer_reps = []
     for swimmer in setInstance.swimmers.all():
         swimmers.append(swimmer)
-        reps = []
-        intervals = []
-        for rep in setInstance.rep_set.all():
-            # get interval object
-            try:
-                interval = Interval.objects.filter(rep=rep).get(swimmer=swimmer)
-                if interval.time == timedelta(seconds=0):
-                    interval = None
-            except Interval.DoesNotExist:
+        rep_intervals = []
+        for rep in reps:
+            interval = intervals.get((rep.id, swimmer.id))
+            if interval and interval.time == timedelta(seconds=0):
                 interval = None
-
-            reps.append(rep)
-            intervals.append(interval)
-        swimmer_reps.append(zip(reps, intervals)) # list of (Rep, Interval) tuples
+            rep_intervals.append(interval)
+        swimmer_reps.append(zip(reps, rep_intervals)) # list of (Rep, Interval) tuples
 
     return zip(swimmers, swimmer_reps) # list of (Swimmer, (Rep, Interval)) tuples)
 
@@ -139,33 +124,47 @@ def get_zipped_set(setInstance):
 def get_practices_and_dates(team, weeks):
     """
     Returns two lists: one of practice, weekday tuples; and one of weekday, date
-    tuples.
+    tuples. The week's practices, sets, swimmers, reps, and intervals are
+    fetched up front so the schedule takes the same number of queries however
+    big the practices are.
     """
+    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday' ,'sunday']
+
+    # keep the first practice for each day and delete any duplicates
+    week_practices = {}
+    duplicates = []
+    for practice in Practice.objects.filter(team=team, week_id=weeks['current']).order_by(
+            'id').prefetch_related('set_set__swimmers', 'set_set__rep_set'):
+        if practice.weekday in week_practices:
+            duplicates.append(practice.id)
+        else:
+            week_practices[practice.weekday] = practice
+    if duplicates:
+        Practice.objects.filter(pk__in=duplicates).delete()
+
+    intervals = {}
+    if week_practices:
+        for interval in Interval.objects.filter(
+                rep__set_id__practice_id__in=week_practices.values()):
+            intervals[(interval.rep_id, interval.swimmer_id)] = interval
+
     practices = []
     practice_sets = []
-    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday' ,'sunday']
     for day in weekdays:
         # create list of practices
-        try:
+        practice = week_practices.get(day)
+        if practice:
             sets = []
             swimmers = []
-            practice = Practice.objects.filter(team=team).filter(
-                week_id=weeks['current']).filter(weekday=day)
-            if len(practice) > 1:
-                for p in practice.order_by('id')[1:]:
-                    p.delete()
-            practice = Practice.objects.filter(team=team).filter(
-                week_id=weeks['current']).get(weekday=day)
-
             for s in practice.set_set.all():
                 sets.append(s) # Set object
                 # list of (Swimmer, (Rep, Interval)) tuples
-                swimmers.append(get_zipped_set(s))
+                swimmers.append(get_zipped_set(s, intervals))
 
             # list of (Set, (Swimmer, (Rep, Interval))) tuples
             practice_sets.append(zip(sets, swimmers))
             practices.append(practice)
-        except Practice.DoesNotExist:
+        else:
             practice_sets.append((None, (None, (None, None))))
             practices.append(None)
 
@@ -187,48 +186,76 @@ def get_practices_and_dates(team, weeks):
     return practices, dates
 
 
+def get_base_times(swimmers, pace_name, strokes, team_bases=None):
+    """
+    Returns a dict of base event times in seconds keyed by (swimmer id, stroke)
+    for each swimmer with a base event for the pace, using the cached bases of
+    the swimmers' teams. team_bases can be a dict shared between calls so each
+    team's bases are only read from the cache once.
+    """
+    if pace_name not in pace.PACES:
+        return {}
+
+    if team_bases is None:
+        team_bases = {}
+    bases = {}
+    for swimmer in swimmers:
+        if swimmer.team_id not in team_bases:
+            team_bases[swimmer.team_id] = get_team_bases(swimmer.team_id)
+        swimmer_bases = team_bases[swimmer.team_id].get(swimmer.id, {})
+        for stroke in strokes:
+            time = swimmer_bases.get(pace.PACES[pace_name]['event'] % stroke)
+            if time is not None:
+                bases[(swimmer.id, stroke)] = time.total_seconds()
+    return bases
+
+
+def get_set_intervals(setInstance, reps, swimmers, multiplier, team_bases=None):
+    """
+    Returns unsaved intervals for each swimmer for each rep in a set. The
+    intervals for the whole set are computed at once (see teams.pace).
+    """
+    bases = get_base_times(swimmers, setInstance.pace, set(rep.stroke for rep in reps), team_bases)
+
+    if setInstance.pace in pace.PACES:
+        # base times with a row for each swimmer and a column for each rep,
+        # NaN if the swimmer doesn't have a base for the rep's stroke
+        base = np.array([[bases.get((swimmer.id, rep.stroke), np.nan) for rep in reps]
+            for swimmer in swimmers], dtype=float).reshape(len(swimmers), len(reps))
+        times = pace.calculate_pace(base, [rep.distance for rep in reps], multiplier,
+            setInstance.pace, strokes=[rep.stroke for rep in reps])
+        # time is 0 if there's no base, essentially a flag
+        times = np.nan_to_num(times)
+    else:
+        times = np.zeros((len(swimmers), len(reps)))
+
+    return [
+        Interval(swimmer=swimmer, rep=rep, time=timedelta(seconds=int(times[i, j])))
+        for i, swimmer in enumerate(swimmers)
+        for j, rep in enumerate(reps)
+    ]
+
+
 def calculate_intervals(setInstance, training_model):
     """
-    Calculates intervals for each rep for each swimmer.
+    Calculates intervals for each rep for each swimmer. The intervals for the
+    whole set are saved with a single insert.
     """
     try:
         multiplier = float(training_model.trainingmultiplier_set.get(focus=setInstance.focus).multiplier)
     except (AttributeError, TrainingMultiplier.DoesNotExist):
         multiplier = None
 
-    reps = []
-    swimmers = []
-    intervals = []
-
     if multiplier:
-        for rep in setInstance.rep_set.all():
-            num_50 = rep.distance / 50 # number of 50s for the distance
-            for swimmer in setInstance.swimmers.all():
-                base = swimmer.get_base(setInstance.pace, rep.stroke) # get base
-                if multiplier and base:
-                    # add multiplier to base
-                    time = timedelta(seconds=((1 + multiplier) * base.total_seconds()))
-                    # multiply base by the number of 50s
-                    time = timedelta(seconds=(num_50 * time.total_seconds()))
-
-                    if setInstance.pace == 'train':
-                        # training intervals should end in :00 or :05
-                        time = timedelta(seconds=int(time.total_seconds()))
-                        while int(time.total_seconds() % 5):
-                            time += timedelta(seconds=1)
-                    else:
-                        time = timedelta(seconds=int(time.total_seconds()))
-
-                else:
-                    # time is 0 if no multiplier is set
-                    # essentially a flag
-                    time = timedelta(seconds=0)
-
-                # create interval object
-                intervals = Interval.objects.filter(rep=rep).filter(swimmer=swimmer)
-                for interval in intervals:
-                    interval.delete()
-                interval = Interval.objects.create(swimmer=swimmer, rep=rep, time=time)
+        reps = list(setInstance.rep_set.all())
+        swimmers = list(setInstance.swimmers.all())
+        intervals = get_set_intervals(setInstance, reps, swimmers, multiplier)
+
+        with transaction.atomic():
+            Interval.objects.filter(rep__in=reps, swimmer__in=swimmers).delete()
+            Interval.objects.bulk_create(intervals)
+        # bulk inserts and deletes don't send signals
+        schedule.invalidate_practices(pk=setInstance.practice_id_id)
 
         return True
 
@@ -236,16 +263,64 @@ def calculate_intervals(setInstance, training_model):
         return False
 
 
+def recalculate_intervals(team, start=None, end=None, chunk_size=100, progress=None):
+    """
+    Recalculates the intervals of every set in the team's practices between the
+    start and end dates (either can be None to leave the range open) with the
+    team's training model. Sets are recalculated in chunks, each in its own
+    transaction, and progress is called with the number of sets done and the
+    total after each chunk. Like the practice editor, sets with rest instead
+    of intervals are skipped. Returns the number of sets recalculated, or None
+    if the team has no training model.
+    """
+    try:
+        training_model = TrainingModel.objects.get(team=team)
+    except TrainingModel.DoesNotExist:
+        return None
+
+    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday' ,'sunday']
+    practices = Practice.objects.filter(team=team, week_id__isnull=False)
+    if start:
+        practices = practices.filter(week_id__monday__gt=start - timedelta(days=7))
+    if end:
+        practices = practices.filter(week_id__monday__lte=end)
+
+    practice_ids = []
+    for practice_id, monday, weekday in practices.values_list('id', 'week_id__monday', 'weekday'):
+        day = monday + timedelta(days=weekdays.index(weekday))
+        if (not start or day >= start) and (not end or day <= end):
+            practice_ids.append(practice_id)
+
+    set_ids = list(Set.objects.filter(practice_id__in=practice_ids).order_by('id').values_list('id', flat=True))
+    count = 0
+    for i in range(0, len(set_ids), chunk_size):
+        chunk = Set.objects.filter(pk__in=set_ids[i:i + chunk_size]).prefetch_related('rep_set', 'swimmers')
+        with transaction.atomic():
+            for setInstance in chunk:
+                if any(rep.rest for rep in setInstance.rep_set.all()):
+                    continue
+                if calculate_intervals(setInstance, training_model):
+                    count += 1
+        if progress:
+            progress(min(i + chunk_size, len(set_ids)), len(set_ids))
+
+    return count
+
+
 def get_swimmer_records(swimmer):
     """
     Returns the fastest time in each event for the given swimmer or None if there
     is no time for the event.
     """
+    bests = {}
+    for best in swimmer.personalbest_set.select_related('result'):
+        bests[best.event] = best.result
+
     records = []
     for event in EVENT_CHOICE:
         if 'base' in event[0]:
             continue
-        records.append((event[1], swimmer.get_best_time(event[0])))
+        records.append((event[1], bests.get(event[0])))
 
     return records
 
@@ -255,10 +330,12 @@ def get_team_records(team):
     Returns the fastest time in each event for the given team for men and women
     or None if there is no time for the event.
     """
+    bests = get_team_bests(team)
+
     records = []
     for event in EVENT_CHOICE:
         if 'base' in event[0]:
             continue
-        records.append(team.get_record(event))
+        records.append((event[1], bests.get((event[0], 'M')), bests.get((event[0], 'F'))))
 
     return records
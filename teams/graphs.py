@@ -1,4 +1,7 @@
 import json
+from collections import defaultdict, OrderedDict
+
+import numpy as np
 
 from bokeh.plotting import figure, output_file, show
 from bokeh.layouts import column, widgetbox
@@ -24,189 +27,79 @@ def date_time_hover_tool():
     """
     return HoverTool(tooltips=hover_html)
 
-def graph_event(swimmer):
-    data_source = {}
-    events = []
-    first_event = None
-    max_len = 0
-    for event in EVENT_CHOICE:
-        e = '_'.join([word.lower() for word in event[0].split()])
-
-        results = Event.objects.filter(swimmer=swimmer).filter(event=event[0]).order_by('date')
-        if results.exists():
-            if len(results) == 1: # one point will not display well on graph
-                continue
-
-            events.append(event[1])
-            if first_event == None:
-                first_event = e
-
-            x, y = [], []
-            date, time = [], []
-            result_len = 0
-            for r in results.iterator():
-                d = r.date
-                t = r.time.total_seconds()
-                x.append(d)
-                y.append(t)
-                date.append(d.strftime('%m/%d/%y')) # date to string for hover
-                time.append('{:d}:{:.2f}'.format(int(t)/60, t%60)) # time to string for hover
-
-                result_len += 1
-
-            if result_len > max_len:
-                max_len = result_len
-
-            data_source['x_'+e] = x
-            data_source['y_'+e] = y
-            data_source['date_'+e] = date
-            data_source['time_'+e] = time
-
-    if not first_event:
-        return None, None
+def event_key(event):
+    """
+    Returns the name used for an event in data source columns, e.g. 50_free.
+    """
+    return '_'.join([word.lower() for word in event.split()])
+
 
-    for entry in data_source:
-        for i in range(max_len - len(data_source[entry])):
-            data_source[entry].insert(0, data_source[entry][0])
-
-    # set initial graph
-    data_source['x'] = data_source['x_'+first_event]
-    data_source['y'] = data_source['y_'+first_event]
-    data_source['date'] = data_source['date_'+first_event]
-    data_source['time'] = data_source['time_'+first_event]
-
-    source = ColumnDataSource(data_source)
-
-    # callback modifies data source depending on Select box
-    callback = CustomJS(args=dict(source=source), code="""
-            data = source.data;
-            f = cb_obj.value;
-
-            if (f == "50 Freestyle") {
-                data['x'] = data.x_50_free;
-                data['y'] = data.y_50_free;
-                data['date'] = data.date_50_free;
-                data['time'] = data.time_50_free;
-            } else if (f == "100 Freestyle") {
-                data['x'] = data.x_100_free;
-                data['y'] = data.y_100_free;
-                data['date'] = data.date_100_free;
-                data['time'] = data.time_100_free;
-            } else if (f == "200 Freestyle") {
-                data['x'] = data.x_200_free;
-                data['y'] = data.y_200_free;
-                data['date'] = data.date_200_free;
-                data['time'] = data.time_200_free;
-            } else if (f == "500 Freestyle") {
-                data['x'] = data.x_500_free;
-                data['y'] = data.y_500_free;
-                data['date'] = data.date_500_free;
-                data['time'] = data.time_500_free;
-            } else if (f == "1000 Freestyle") {
-                data['x'] = data.x_1000_free;
-                data['y'] = data.y_1000_free;
-                data['date'] = data.date_1000_free;
-                data['time'] = data.time_1000_free;
-            } else if (f == "50 Backstroke") {
-                data['x'] = data.x_50_back;
-                data['y'] = data.y_50_back;
-                data['date'] = data.date_50_back;
-                data['time'] = data.time_50_back;
-            } else if (f == "100 Backstroke") {
-                data['x'] = data.x_100_back;
-                data['y'] = data.y_100_back;
-                data['date'] = data.date_100_back;
-                data['time'] = data.time_100_back;
-            } else if (f == "200 Backstroke") {
-                data['x'] = data.x_200_back;
-                data['y'] = data.y_200_back;
-                data['date'] = data.date_200_back;
-                data['time'] = data.time_200_back;
-            } else if (f == "50 Breaststroke") {
-                data['x'] = data.x_50_breast;
-                data['y'] = data.y_50_breast;
-                data['date'] = data.date_50_breast;
-                data['time'] = data.time_50_breast;
-            } else if (f == "100 Breaststroke") {
-                data['x'] = data.x_100_breast;
-                data['y'] = data.y_100_breast;
-                data['date'] = data.date_100_breast;
-                data['time'] = data.time_100_breast;
-            } else if (f == "200 Breaststroke") {
-                data['x'] = data.x_200_breast;
-                data['y'] = data.y_200_breast;
-                data['date'] = data.date_200_breast;
-                data['time'] = data.time_200_breast;
-            } else if (f == "50 Butterfly") {
-                data['x'] = data.x_50_fly;
-                data['y'] = data.y_50_fly;
-                data['date'] = data.date_50_fly;
-                data['time'] = data.time_50_fly;
-            } else if (f == "100 Butterfly") {
-                data['x'] = data.x_100_fly;
-                data['y'] = data.y_100_fly;
-                data['date'] = data.date_100_fly;
-                data['time'] = data.time_100_fly;
-            } else if (f == "200 Butterfly") {
-                data['x'] = data.x_200_fly;
-                data['y'] = data.y_200_fly;
-                data['date'] = data.date_200_fly;
-                data['time'] = data.time_200_fly;
-            } else if (f == "100 IM") {
-                data['x'] = data.x_100_im;
-                data['y'] = data.y_100_im;
-                data['date'] = data.date_100_im;
-                data['time'] = data.time_100_im;
-            } else if (f == "200 IM") {
-                data['x'] = data.x_200_im;
-                data['y'] = data.y_200_im;
-                data['date'] = data.date_200_im;
-                data['time'] = data.time_200_im;
-            } else if (f == "400 IM") {
-                data['x'] = data.x_400_im;
-                data['y'] = data.y_400_im;
-                data['date'] = data.date_400_im;
-                data['time'] = data.time_400_im;
-            } else if (f == "Base Freestyle") {
-                data['x'] = data.x_base_free;
-                data['y'] = data.y_base_free;
-                data['date'] = data.date_base_free;
-                data['time'] = data.time_base_free;
-            } else if (f == "Base Backstroke") {
-                data['x'] = data.x_base_back;
-                data['y'] = data.y_base_back;
-                data['date'] = data.date_base_back;
-                data['time'] = data.time_base_back;
-            } else if (f == "Base Breaststroke") {
-                data['x'] = data.x_base_breast;
-                data['y'] = data.y_base_breast;
-                data['date'] = data.date_base_breast;
-                data['time'] = data.time_base_breast;
-            } else if (f == "Base Butterfly") {
-                data['x'] = data.x_base_fly;
-                data['y'] = data.y_base_fly;
-                data['date'] = data.date_base_fly;
-                data['time'] = data.time_base_fly;
-            } else if (f == "Base IM") {
-                data['x'] = data.x_base_im;
-                data['y'] = data.y_base_im;
-                data['date'] = data.date_base_im;
-                data['time'] = data.time_base_im;
-            }
-
-            source.change.emit();
-    """)
-
-    try:
-        select = Select(
-            title="Event:",
-            value=events[0],
-            options=events
-        )
-        select.js_on_change('value', callback)
-    except IndexError:
+def get_event_columns(swimmer, events=None):
+    """
+    Returns an OrderedDict of the swimmer's results for each event (or only the
+    given events), in the order of EVENT_CHOICE, with a dict of x (date), y
+    (seconds), date and time (strings for the hover tool) columns ordered by
+    date. The whole history is fetched with one query. Events with only one
+    result are left out since one point doesn't display well on a graph.
+    """
+    history = Event.objects.filter(swimmer=swimmer)
+    if events is not None:
+        history = history.filter(event__in=events)
+
+    results = defaultdict(list)
+    for event, d, t in history.order_by('date', 'id').values_list('event', 'date', 'time'):
+        results[event].append((d, t.total_seconds()))
+
+    columns = OrderedDict()
+    for event, name in EVENT_CHOICE:
+        if len(results[event]) < 2:
+            continue
+        columns[event] = {
+            'x': [d for d, t in results[event]],
+            'y': [t for d, t in results[event]],
+            'date': [d.strftime('%m/%d/%y') for d, t in results[event]], # date to string for hover
+            'time': ['{:d}:{:.2f}'.format(int(t)/60, t%60) for d, t in results[event]], # time to string for hover
+        }
+    return columns
+
+
+def get_event_sources(swimmer, events=None):
+    """
+    Returns an OrderedDict of a ColumnDataSource for each of the swimmer's
+    events with each series at its own length. x and y are NumPy arrays so
+    Bokeh sends them as base64 encoded buffers instead of lists of numbers.
+    """
+    sources = OrderedDict()
+    for event, columns in get_event_columns(swimmer, events).items():
+        sources[event] = ColumnDataSource(name=event, data={
+            'x': np.array(columns['x'], dtype='datetime64[D]'),
+            'y': np.array(columns['y'], dtype=float),
+            'date': columns['date'],
+            'time': columns['time'],
+        })
+    return sources
+
+
+def graph_event(swimmer, events=None):
+    sources = get_event_sources(swimmer, events)
+    if not sources:
         return None, None
 
+    # the plotted source starts with the first event, the callback swaps in
+    # the series of the selected event (see teams.progress.CHART_SCRIPT)
+    source = ColumnDataSource(dict(list(sources.values())[0].data))
+    args = dict(('source_' + event_key(event), s) for event, s in sources.items())
+    args['source'] = source
+    callback = CustomJS(args=args, code='CoachMate.charts.selectEvent(source, cb_obj);')
+
+    names = dict(EVENT_CHOICE)
+    select = Select(
+        title="Event:",
+        value=list(sources)[0],
+        options=[(event, names[event]) for event in sources]
+    )
+    select.js_on_change('value', callback)
+
     # plot instance
     hover_tool = date_time_hover_tool()
     tools = ['pan', 'box_zoom', hover_tool, 'reset', 'save']
@@ -221,11 +114,7 @@ def graph_event(swimmer):
         responsive=True,
     )
     # format datetime.timedelta objects to MM:ss.mm
-    plot.yaxis.formatter = FuncTickFormatter(code=
-        """
-        return Math.floor(tick/60) + ":" + (tick%60).toFixed(2)
-        """
-    )
+    plot.yaxis.formatter = FuncTickFormatter(code='return CoachMate.charts.formatTime(tick);')
     plot.line('x', 'y', source=source)
 
     return components(column(select, plot, responsive=True))
@@ -0,0 +1,155 @@
+"""
+Parser for the .CL2 and .HY3 files exported by HyTek's Team Manager.
+
+Both formats are made up of fixed-width records where the first two characters
+give the record type (A0/A1 file header, B1 meet, C1 team, D0/D1 swimmer,
+E1/E2 individual event, Z0 file terminator, ...). The parser only looks at the
+records it needs and yields plain records, so it has no knowledge of the
+database and can be run on its own.
+"""
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+# A swimmer from a roster file
+RosterRecord = namedtuple('RosterRecord', ['first', 'last', 'gender', 'birth_date'])
+# A single swim from a results file
+ResultRecord = namedtuple('ResultRecord', ['first', 'last', 'gender', 'event', 'time', 'place', 'date'])
+# A record that couldn't be parsed (first and last are None for roster records)
+ErrorRecord = namedtuple('ErrorRecord', ['line', 'first', 'last'])
+
+
+class MeetDateError(ValueError):
+    """
+    Raised when the meet date can't be found in a results file.
+    """
+    pass
+
+
+EVENT_STROKES = {
+    'A': 'free',
+    'B': 'back',
+    'C': 'breast',
+    'D': 'fly',
+    'E': 'im',
+}
+
+# capture groups: <---><LAST>, <FIRST><---><MONTH><DAY><YEAR><---><GENDER>
+CL2_NAME = re.compile(r"(?P<last>[a-zA-Z]+[-' ]?[a-zA-Z]*), (?P<first>[a-zA-Z]+)")
+CL2_GENDER = re.compile(r'[^a-z^A-Z](?P<gender>[MF])[^a-z^A-Z]')
+HY3_NAME = re.compile(r"(?P<last>[a-zA-Z]+([-' ]?[a-zA-Z]+))(\s+)(?P<first>[a-zA-Z]+)")
+HY3_GENDER = re.compile(r'([A-Z]+[\d]+)(?P<gender>[MF])')
+DATE = re.compile(r'(?P<month>\d{2})(?P<day>\d{2})(?P<year>\d{4})')
+
+RESULT_SWIMMER = re.compile(r"(D1(?P<gender>[MF])[\s]+[\d]+)(?P<last>[a-zA-Z]+([-' ]?[a-zA-Z]+))(\s+)(?P<first>[a-zA-Z]+)")
+RESULT_EVENT = re.compile(r'([ABCDE][\d][MF][\s]+[\d]+[a-zA-Z]+([\s]+[MF]+)?[\s]+)(?P<dist>[\d]+)(?P<event>[ABCDE])')
+RESULT_TIME = re.compile(r'([ABCDE][\d][MFT][\s]+)(?P<time>[\d]+[.][\d]+)([Y ][RQ]?[\s]+)(?P<place>[\dX]+)')
+
+ROSTER_RECORDS = {
+    '.cl2': ('D0', CL2_NAME, CL2_GENDER),
+    '.hy3': ('D1', HY3_NAME, HY3_GENDER),
+}
+
+
+def parse_date(line):
+    """
+    Returns the first MMDDYYYY date in a line or None.
+    """
+    match = DATE.search(line)
+    if not match:
+        return None
+
+    return date(
+        int(match.group('year')),
+        int(match.group('month')),
+        int(match.group('day'))
+    )
+
+
+def iter_roster(lines, ext):
+    """
+    Yields a RosterRecord for each swimmer in a .CL2 or .HY3 roster file, or an
+    ErrorRecord if a swimmer record can't be read.
+    """
+    code, name_capture, gender_capture = ROSTER_RECORDS[ext.lower()]
+
+    for line in lines:
+        if line.startswith('Z0'):
+            break
+        elif not line.startswith(code):
+            continue
+
+        swimmer_name = name_capture.search(line)
+        swimmer_gender = gender_capture.search(line)
+        if not (swimmer_name and swimmer_gender):
+            yield ErrorRecord(line, None, None)
+            continue
+
+        yield RosterRecord(
+            swimmer_name.group('first'),
+            swimmer_name.group('last'),
+            swimmer_gender.group('gender'),
+            parse_date(line), # birthday may be left out
+        )
+
+
+def iter_results(lines):
+    """
+    Yields a ResultRecord for each individual swim in a .HY3 results file, or an
+    ErrorRecord if the time and place for a swim can't be read.
+
+    Raises MeetDateError if the meet record doesn't contain a date.
+    """
+    meet_date = None
+    swimmer = None
+    event = None
+
+    for line in lines:
+        if event:
+            # the line after an event record holds its time and place
+            time_place = RESULT_TIME.search(line)
+            current, event = event, None
+            if not time_place:
+                yield ErrorRecord(line, swimmer[0], swimmer[1])
+                continue
+
+            time = float(time_place.group('time'))
+            if time == 0.00:
+                continue
+            try:
+                place = int(time_place.group('place'))
+            except ValueError:
+                place = None
+
+            yield ResultRecord(
+                swimmer[0],
+                swimmer[1],
+                swimmer[2],
+                current,
+                timedelta(seconds=time),
+                place,
+                meet_date,
+            )
+
+        elif line.startswith('B1'):
+            meet_date = parse_date(line)
+            if not meet_date:
+                raise MeetDateError(line)
+
+        elif line.startswith('D1'):
+            swimmer_name = RESULT_SWIMMER.search(line)
+            if swimmer_name:
+                swimmer = (
+                    swimmer_name.group('first'),
+                    swimmer_name.group('last'),
+                    swimmer_name.group('gender'),
+                )
+            else:
+                swimmer = None
+
+        elif line.startswith('E1') and swimmer:
+            match = RESULT_EVENT.search(line)
+            if match:
+                if not meet_date:
+                    raise MeetDateError(line)
+                event = match.group('dist') + ' ' + EVENT_STROKES[match.group('event')]
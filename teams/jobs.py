@@ -0,0 +1,125 @@
+import io, json, logging, zipfile
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from teams.models import ImportJob
+from teams.TeamManager import TeamManager
+
+tmlogger = logging.getLogger('CoachMate.tm')
+
+# running jobs save their progress as they go, so a job that hasn't been
+# updated for this long was stopped along with its worker
+JOB_TIMEOUT = timedelta(minutes=30)
+
+def get_import_kind(file_name):
+    """
+    Returns the type of Team Manager import based on the file name or None.
+    """
+    if 'Roster' in file_name:
+        return 'roster'
+    elif 'Results' in file_name:
+        return 'results'
+    return None
+
+
+def enqueue_import(team, upload):
+    """
+    Stores an uploaded Team Manager zip file as a queued import job.
+    """
+    return ImportJob.objects.create(
+        team=team,
+        kind=get_import_kind(upload.name),
+        file_name=upload.name,
+        data=upload.read(),
+    )
+
+
+def enqueue_batch(team, uploads):
+    """
+    Stores many uploaded results zip files as one queued job. The uploads are
+    combined into a zip file of zip files.
+    """
+    buf = io.BytesIO()
+    zip_ref = zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED)
+    for upload in uploads:
+        zip_ref.writestr(upload.name, upload.read())
+    zip_ref.close()
+
+    return ImportJob.objects.create(
+        team=team,
+        kind='batch',
+        file_name='%d meets' % len(uploads),
+        data=buf.getvalue(),
+    )
+
+
+def claim_job():
+    """
+    Marks the oldest queued job as running and returns it, or None if there
+    are no queued jobs. Jobs locked by another worker are skipped. Running
+    jobs that haven't been updated within JOB_TIMEOUT are marked as failed
+    first, since their worker was stopped before it could finish them.
+    """
+    with transaction.atomic():
+        ImportJob.objects.filter(status='running', updated__lt=timezone.now() - JOB_TIMEOUT).update(
+            status='failed',
+            progress=100,
+            messages=json.dumps([('error', 'Import stopped before it finished - upload the file again')]),
+            data=b'',
+            updated=timezone.now(),
+        )
+
+        job = ImportJob.objects.select_for_update(skip_locked=True).filter(
+            status='queued').first()
+        if job:
+            job.status = 'running'
+            job.save(update_fields=['status', 'updated'])
+    return job
+
+
+def run_job(job):
+    """
+    Runs a Team Manager import for the job and stores its messages.
+    """
+    def progress(percent):
+        job.progress = percent
+        job.save(update_fields=['progress', 'updated'])
+
+    zip_file = ContentFile(bytes(job.data), name=job.file_name)
+    tm = TeamManager(team=job.team, zip_file=zip_file, progress=progress)
+    try:
+        if job.kind == 'roster':
+            msgs = tm.load_roster()
+        elif job.kind == 'batch':
+            msgs = tm.load_batch()
+        else:
+            msgs = tm.load_results()
+        job.status = 'done'
+    except Exception as e:
+        tmlogger.exception(e)
+        msgs = tm.msg + [('error', 'Couldn\'t import %s' % job.file_name)]
+        job.status = 'failed'
+
+    job.progress = 100
+    job.set_messages(msgs)
+    job.data = b'' # the upload isn't needed once it's been imported
+    job.save()
+    return job
+
+
+def run_pending(limit=None):
+    """
+    Runs queued jobs until there are none left or the limit is reached. Returns
+    the number of jobs run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_job()
+        if not job:
+            break
+        run_job(job)
+        count += 1
+    return count
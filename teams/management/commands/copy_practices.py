@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from teams.cloning import clone_cycle
+from teams.management.helpers import add_team_arguments, get_team, parse_date
+
+class Command(BaseCommand):
+    help = 'Copies a team\'s practices from a range of weeks onto later weeks'
+
+    def add_arguments(self, parser):
+        add_team_arguments(parser)
+        parser.add_argument('--start', type=parse_date, required=True, help='A date in the first week to copy (YYYY-MM-DD)')
+        parser.add_argument('--end', type=parse_date, help='A date in the last week to copy (YYYY-MM-DD), the first week if not given')
+        parser.add_argument('--to', type=parse_date, required=True, help='A date in the first week to copy onto (YYYY-MM-DD)')
+        parser.add_argument('--repeats', type=int, default=1, help='Number of times to copy the weeks back to back')
+
+    def handle(self, *args, **options):
+        team = get_team(options)
+
+        practices = clone_cycle(team, options['start'], options['end'] or options['start'],
+            options['to'], repeats=options['repeats'])
+        self.stdout.write('Copied %d practice(s)' % len(practices))
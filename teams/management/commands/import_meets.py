@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from teams.management.helpers import add_team_arguments, get_team
+from teams.TeamManager import TeamManager
+
+class Command(BaseCommand):
+    help = 'Imports results from many Team Manager meet zip files at once'
+
+    def add_arguments(self, parser):
+        add_team_arguments(parser)
+        parser.add_argument('zip_files', nargs='+', help='Meet results zip files, or zip files of them')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of processes used to parse the files',
+        )
+
+    def handle(self, *args, **options):
+        team = get_team(options)
+
+        files = []
+        try:
+            for path in options['zip_files']:
+                if not os.path.isfile(path):
+                    raise CommandError('File "%s" does not exist' % path)
+                files.append(open(path, 'rb'))
+
+            tm = TeamManager(team=team)
+            msgs = tm.load_batch(files, workers=options['workers'])
+        finally:
+            for f in files:
+                f.close()
+
+        for level, message in msgs:
+            if level == 'success':
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stderr.write(message)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from teams.models import Team, Swimmer
+from teams import records
+
+class Command(BaseCommand):
+    help = 'Recalculates swimmers\' personal bests from their results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'abbr',
+            nargs='*',
+            help='Abbreviations of the teams to rebuild (default: all teams)',
+        )
+
+    def handle(self, *args, **options):
+        swimmers = None
+        if options['abbr']:
+            teams = Team.objects.filter(abbr__in=options['abbr'])
+            if not teams.exists():
+                raise CommandError('No teams found')
+            swimmers = Swimmer.objects.filter(team__in=teams)
+
+        count = records.rebuild_personal_bests(swimmers)
+        self.stdout.write('Saved %d personal best(s)' % count)
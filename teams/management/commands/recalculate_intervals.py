@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import teams.functions as funct
+from teams.management.helpers import add_team_arguments, get_team, parse_date
+
+class Command(BaseCommand):
+    help = 'Recalculates the intervals of a team\'s practices with its training model'
+
+    def add_arguments(self, parser):
+        add_team_arguments(parser)
+        parser.add_argument('--start', type=parse_date, help='First practice date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=parse_date, help='Last practice date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Number of sets recalculated in each transaction',
+        )
+
+    def handle(self, *args, **options):
+        team = get_team(options)
+
+        def progress(done, total):
+            self.stdout.write('%d/%d sets' % (done, total))
+
+        count = funct.recalculate_intervals(team, options['start'], options['end'],
+            chunk_size=options['chunk_size'], progress=progress)
+        if count is None:
+            raise CommandError('Team "%s" has no training model' % options['abbr'])
+        self.stdout.write('Recalculated intervals for %d set(s)' % count)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from teams import jobs
+
+class Command(BaseCommand):
+    help = 'Runs queued Team Manager import jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs currently queued then exit',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait between checks for new jobs',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = jobs.run_pending()
+            if count:
+                self.stdout.write('Ran %d import job(s)' % count)
+            if options['once']:
+                break
+            if not count:
+                time.sleep(options['sleep'])
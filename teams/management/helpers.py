@@ -0,0 +1,38 @@
+"""
+Arguments shared by the management commands that work on one team.
+"""
+from datetime import datetime
+
+from django.core.management.base import CommandError
+
+from teams.models import Team
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def add_team_arguments(parser):
+    """
+    Adds the team abbreviation and --user arguments used by get_team.
+    """
+    parser.add_argument('abbr', help='Team abbreviation')
+    parser.add_argument(
+        '--user',
+        help='Username of the team\'s coach if more than one team uses the abbreviation',
+    )
+
+
+def get_team(options):
+    """
+    Returns the team named by the abbr and --user options, raising a
+    CommandError if there isn't exactly one.
+    """
+    teams = Team.objects.filter(abbr=options['abbr'])
+    if options['user']:
+        teams = teams.filter(user__username=options['user'])
+    try:
+        return teams.get()
+    except Team.DoesNotExist:
+        raise CommandError('Team "%s" does not exist' % options['abbr'])
+    except Team.MultipleObjectsReturned:
+        raise CommandError('More than one team named "%s", use --user' % options['abbr'])
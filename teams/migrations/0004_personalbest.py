@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 10:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_personal_bests(apps, schema_editor):
+    Event = apps.get_model('teams', 'Event')
+    PersonalBest = apps.get_model('teams', 'PersonalBest')
+
+    bests = {}
+    for pk, swimmer_id, event, time in Event.objects.filter(swimmer__isnull=False).order_by(
+            'swimmer_id', 'event', 'time', 'date', 'id').values_list('id', 'swimmer', 'event', 'time'):
+        if (swimmer_id, event) not in bests:
+            bests[(swimmer_id, event)] = PersonalBest(
+                swimmer_id=swimmer_id, event=event, result_id=pk, time=time)
+    PersonalBest.objects.bulk_create(bests.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_importjob_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalBest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('50 free', '50 Freestyle'), ('100 free', '100 Freestyle'), ('200 free', '200 Freestyle'), ('500 free', '500 Freestyle'), ('1000 free', '1000 Freestyle'), ('50 back', '50 Backstroke'), ('100 back', '100 Backstroke'), ('200 back', '200 Backstroke'), ('50 breast', '50 Breaststroke'), ('100 breast', '100 Breaststroke'), ('200 breast', '200 Breaststroke'), ('50 fly', '50 Butterfly'), ('100 fly', '100 Butterfly'), ('200 fly', '200 Butterfly'), ('100 im', '100 IM'), ('200 im', '200 IM'), ('400 im', '400 IM'), ('base free', 'Freestyle Base'), ('base back', 'Backstroke Base'), ('base breast', 'Breaststroke Base'), ('base fly', 'Butterfly Base'), ('base IM', 'IM Base')], max_length=10)),
+                ('time', models.DurationField()),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.Event')),
+                ('swimmer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.Swimmer')),
+            ],
+            options={
+                'ordering': ['event'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='personalbest',
+            unique_together=set([('swimmer', 'event')]),
+        ),
+        migrations.RunPython(build_personal_bests, migrations.RunPython.noop),
+    ]
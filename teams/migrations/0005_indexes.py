@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 10:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0004_personalbest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interval',
+            index=models.Index(fields=['rep', 'swimmer'], name='interval_rep_swimmer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='practice',
+            index=models.Index(fields=['team', 'week_id', 'weekday'], name='practice_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['team', 'event', 'gender', 'time'], name='event_team_record_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['swimmer', 'event', 'time', 'date'], name='event_swimmer_best_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swimmer',
+            index=models.Index(fields=['team', 'l_name', 'f_name', 'gender', 'birth_date'], name='swimmer_roster_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 10:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0005_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='week',
+            name='monday',
+            field=models.DateField(db_index=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import json
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 
@@ -25,16 +26,9 @@ class Team(models.Model):
         """
         Return best time in given event.
         """
-        times_men = Event.objects.filter(team=self).filter(event=event[0]).filter(gender='M')
-        times_women = Event.objects.filter(team=self).filter(event=event[0]).filter(gender='F')
-        result_men = None
-        result_women = None
-        if times_men.exists():
-            result_men = times_men[0]
-        if times_women.exists():
-            result_women = times_women[0]
-
-        return (event[1], result_men, result_women)
+        from teams.records import get_team_bests
+        bests = get_team_bests(self, events=[event[0]])
+        return (event[1], bests.get((event[0], 'M')), bests.get((event[0], 'F')))
 
 GENDER_CHOICE = (
     ('M', 'Male'),
@@ -52,6 +46,10 @@ class Swimmer(models.Model):
 
     class Meta:
         ordering = ['l_name', 'f_name']
+        indexes = [
+            # roster imports match swimmers on every field
+            models.Index(fields=['team', 'l_name', 'f_name', 'gender', 'birth_date'], name='swimmer_roster_idx'),
+        ]
 
     def __str__(self):
         return self.l_name
@@ -59,12 +57,19 @@ class Swimmer(models.Model):
     def __unicode__(self):
         return self.f_name + ' ' + self.l_name
 
-    def set_age(self):
+    def calculate_age(self):
         """
-        Calculate and set age field based on birth date.
+        Calculate age field based on birth date without saving.
         """
         if self.birth_date:
             self.age = int((date.today() - self.birth_date).days / 365.2425)
+        return self.age
+
+    def set_age(self):
+        """
+        Calculate and set age field based on birth date.
+        """
+        self.calculate_age()
         self.save()
         return self.age
 
@@ -72,24 +77,23 @@ class Swimmer(models.Model):
         """
         Return best time in given event.
         """
-        times = self.event_set.filter(event=event)
-        if times.exists():
-            return times[0]
-        else:
+        try:
+            return self.personalbest_set.select_related('result').get(event=event).result
+        except PersonalBest.DoesNotExist:
             return None
 
     def get_base(self, pace, stroke):
         """
-        Returns a swimmer's base pace for the given stroke and pace.
+        Returns a swimmer's base pace for the given stroke and pace. Bases are
+        cached for the whole team (see teams.records).
         """
-        try:
-            if pace == 'train':
-                return self.event_set.filter(event='base ' + stroke)[0].time
-            elif pace == 'race':
-                base = self.event_set.filter(event='100 ' + stroke)[0]
-                return timedelta(seconds=(0.5 * base.time.total_seconds()))
-        except IndexError:
-            return None
+        from teams.records import get_team_bases
+        bases = get_team_bases(self.team_id).get(self.id, {})
+        if pace == 'train':
+            return bases.get('base ' + stroke)
+        elif pace == 'race' and ('100 ' + stroke) in bases:
+            return timedelta(seconds=(0.5 * bases['100 ' + stroke].total_seconds()))
+        return None
 
 # Calendar
 
@@ -134,6 +138,12 @@ class Event(models.Model):
 
     class Meta:
         ordering = ['event', 'time']
+        indexes = [
+            # team records: fastest time for an event and gender
+            models.Index(fields=['team', 'event', 'gender', 'time'], name='event_team_record_idx'),
+            # personal bests: a swimmer's fastest time in an event
+            models.Index(fields=['swimmer', 'event', 'time', 'date'], name='event_swimmer_best_idx'),
+        ]
 
     def __str__(self):
         return self.event
@@ -155,10 +165,28 @@ class Event(models.Model):
             return False
 
 
+class PersonalBest(models.Model):
+    """
+    A swimmer's fastest result in an event. Kept up to date as events are saved
+    and deleted (see teams.records).
+    """
+    swimmer = models.ForeignKey(Swimmer, on_delete=models.CASCADE)
+    event = models.CharField(max_length=10, choices=EVENT_CHOICE)
+    result = models.ForeignKey(Event, on_delete=models.CASCADE)
+    time = models.DurationField()
+
+    class Meta:
+        ordering = ['event']
+        unique_together = ('swimmer', 'event')
+
+    def __str__(self):
+        return self.event
+
+
 # Could add more classes to organize weeks like a calendar or could do it in views
 # Need to figure out how to navigate weeks
 class Week(models.Model):
-    monday = models.DateField(null=True)
+    monday = models.DateField(null=True, db_index=True)
     tuesday = models.DateField(null=True)
     wednesday = models.DateField(null=True)
     thursday = models.DateField(null=True)
@@ -241,6 +269,9 @@ class Practice(models.Model):
 
     class Meta:
         ordering = ['week_id']
+        indexes = [
+            models.Index(fields=['team', 'week_id', 'weekday'], name='practice_schedule_idx'),
+        ]
 
     def __str__(self):
         return self.weekday
@@ -291,6 +322,9 @@ class Interval(models.Model):
 
     class Meta:
         ordering = ['swimmer', 'rep', 'time']
+        indexes = [
+            models.Index(fields=['rep', 'swimmer'], name='interval_rep_swimmer_idx'),
+        ]
 
     def __str__(self):
         return unicode(self.time)
@@ -312,3 +346,46 @@ class TrainingMultiplier(models.Model):
 
     def __str__(self):
         return self.focus
+
+
+# Team Manager imports
+IMPORT_CHOICE = (
+    ('roster', 'Roster'),
+    ('results', 'Results'),
+    ('batch', 'Batch of results'),
+)
+STATUS_CHOICE = (
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+)
+
+# Uploaded Team Manager files waiting to be imported by the worker
+class ImportJob(models.Model):
+    team = models.ForeignKey(Team, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=IMPORT_CHOICE)
+    file_name = models.CharField(max_length=255)
+    data = models.BinaryField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICE, default='queued')
+    progress = models.IntegerField(default=0) # percent complete
+    messages = models.TextField(blank=True) # JSON list of (level, message) pairs
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created', 'id']
+
+    def __str__(self):
+        return self.file_name
+
+    def get_messages(self):
+        """
+        Returns the list of (level, message) pairs collected by the import.
+        """
+        if not self.messages:
+            return []
+        return [tuple(m) for m in json.loads(self.messages)]
+
+    def set_messages(self, msgs):
+        self.messages = json.dumps(list(msgs))
@@ -0,0 +1,104 @@
+"""
+Interval math for practice sets.
+
+An interval is the swimmer's base time per 50 with the training multiplier
+added, times the number of 50s in the rep, rounded to whole seconds and then up
+to the next send-off (:05 for training sets). Everything here works on plain
+numbers and NumPy arrays so intervals for a whole set, or a season of sets, are
+calculated at once without touching the database.
+
+Run ``python -m teams.pace`` for a micro-benchmark.
+"""
+import numpy as np
+
+# send-offs intervals can be rounded up to, in seconds
+SEND_OFFS = (1, 5, 10, 15)
+
+# base event for each pace, how the base time is scaled to a 50, and the send-off
+# intervals are rounded up to
+PACES = {
+    'train': {'event': 'base %s', 'base_scale': 1.0, 'send_off': 5},
+    'race': {'event': '100 %s', 'base_scale': 0.5, 'send_off': 1},
+}
+
+# extra scaling for strokes and distances, 1.0 unless listed
+STROKE_SCALE = {}
+DISTANCE_SCALE = {}
+
+
+def round_send_off(seconds, send_off=5):
+    """
+    Rounds times in seconds down to whole seconds and then up to the next
+    send-off. NaN is left as it is.
+    """
+    if send_off not in SEND_OFFS:
+        raise ValueError('Send-off must be one of %s' % (SEND_OFFS,))
+
+    # round to the microsecond first like a timedelta so float error doesn't
+    # drop a second
+    seconds = np.floor(np.round(np.asarray(seconds, dtype=float), 6))
+    return np.ceil(seconds / send_off) * send_off
+
+
+def scale_table(keys, table):
+    """
+    Returns an array of the scale for each key in a table, 1.0 if not listed.
+    """
+    return np.array([table.get(key, 1.0) for key in keys], dtype=float)
+
+
+def calculate(bases, distances, multiplier, send_off=5, strokes=None,
+        stroke_scale=STROKE_SCALE, distance_scale=DISTANCE_SCALE):
+    """
+    Returns an array of intervals in seconds for an array of base times per 50
+    with a row for each swimmer and a column for each rep, and the distance (and
+    optionally stroke) of each rep. Intervals are NaN where the base is.
+    """
+    bases = np.asarray(bases, dtype=float)
+    distances = np.asarray(distances)
+    num_50 = (distances // 50).astype(float) # number of 50s for the distance
+
+    scale = (1 + multiplier) * num_50 * scale_table(distances.tolist(), distance_scale)
+    if strokes is not None:
+        scale = scale * scale_table(strokes, stroke_scale)
+
+    return round_send_off(bases * scale, send_off)
+
+
+def calculate_pace(bases, distances, multiplier, pace, strokes=None):
+    """
+    Returns intervals for base event times of the given pace ('train' or 'race')
+    using the pace's base scale and send-off.
+    """
+    settings = PACES[pace]
+    return calculate(
+        np.asarray(bases, dtype=float) * settings['base_scale'],
+        distances,
+        multiplier,
+        send_off=settings['send_off'],
+        strokes=strokes,
+    )
+
+
+if __name__ == '__main__':
+    import timeit
+    from datetime import timedelta
+
+    def loop_interval(base, distance, multiplier):
+        # the original one-interval-at-a-time calculation
+        time = timedelta(seconds=((1 + multiplier) * base))
+        time = timedelta(seconds=((distance // 50) * time.total_seconds()))
+        time = timedelta(seconds=int(time.total_seconds()))
+        while int(time.total_seconds() % 5):
+            time += timedelta(seconds=1)
+        return time
+
+    # a season plan: 40 swimmers and 2,000 reps
+    rng = np.random.RandomState(0)
+    bases = rng.uniform(25, 40, size=(40, 1))
+    distances = rng.choice([50, 100, 200, 400], size=2000)
+
+    loops = timeit.timeit(lambda: [[loop_interval(b, d, 0.07) for d in distances] for b in bases[:, 0]], number=1)
+    batch = timeit.timeit(lambda: calculate(bases, distances, 0.07), number=10) / 10
+    print('loop:  %8.2f ms' % (loops * 1000))
+    print('numpy: %8.2f ms (%.0fx)' % (batch * 1000, loops / batch))
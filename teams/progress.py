@@ -0,0 +1,85 @@
+"""
+Cached swimmer progress charts.
+
+The swimmer detail page loads its event progress chart from a JSON endpoint
+after the page has rendered, so Bokeh is only imported and run when a chart is
+actually built. Each chart is versioned by the swimmer's results: the number of
+results and the newest one's id make its ETag. Built charts are cached under
+their version, so a chart is only rebuilt once new results are added or old
+ones deleted, and browsers revalidate with a conditional GET.
+
+The chart's JavaScript, which swaps the plotted event and formats times, is a
+static module generated from EVENT_CHOICE and served once for every chart, so
+each chart only carries its data.
+"""
+import hashlib, json
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from teams.models import Event, EVENT_CHOICE
+
+PROGRESS_CACHE_KEY = 'teams:progress:%s:%s:%s'
+PROGRESS_CACHE_TIMEOUT = 60 * 60 * 24 # old versions aren't used again
+
+CHART_SCRIPT = """(function(CoachMate) {
+  var charts = CoachMate.charts = {};
+
+  // event labels keyed by event code
+  charts.events = %s;
+
+  // swaps the series of the event chosen in the Select widget into the
+  // plotted source, each event's data source is named by its event code
+  charts.selectEvent = function(source, select) {
+    if (!(select.value in charts.events)) {
+      return;
+    }
+    var data = select.document.get_model_by_name(select.value).data;
+    source.data['x'] = data.x;
+    source.data['y'] = data.y;
+    source.data['date'] = data.date;
+    source.data['time'] = data.time;
+    source.change.emit();
+  };
+
+  // formats seconds as M:SS.ss
+  charts.formatTime = function(seconds) {
+    return Math.floor(seconds / 60) + ':' + (seconds %% 60).toFixed(2);
+  };
+})(window.CoachMate = window.CoachMate || {});
+""" % json.dumps(dict(EVENT_CHOICE), sort_keys=True)
+CHART_SCRIPT_ETAG = hashlib.md5(CHART_SCRIPT.encode('utf-8')).hexdigest()
+
+def get_version(swimmer_id):
+    """
+    Returns the version of the swimmer's results, used as the chart's ETag,
+    or None if the swimmer has no results.
+    """
+    version = Event.objects.filter(swimmer=swimmer_id).aggregate(count=Count('id'), last_id=Max('id'))
+    if not version['count']:
+        return None
+    return '%d-%d' % (version['count'], version['last_id'])
+
+
+def get_chart(swimmer, event=None, version=None):
+    """
+    Returns a dict of the Bokeh script and div of the swimmer's progress chart
+    for every event, or just the given one, built with Bokeh the first time
+    each version of the chart is requested. The script and div are None if
+    there isn't enough data to graph. The event must be one of EVENT_CHOICE,
+    it's part of the cache key. Pass the version if it's already known to
+    save looking it up again.
+    """
+    if event and event not in dict(EVENT_CHOICE):
+        raise ValueError('Unknown event %r' % event)
+    if version is None:
+        version = get_version(swimmer.id)
+    key = PROGRESS_CACHE_KEY % (swimmer.id, version, (event or 'all').replace(' ', '_'))
+    chart = cache.get(key)
+    if chart is None:
+        from teams.graphs import graph_event # Bokeh is slow to import
+
+        script, div = graph_event(swimmer, [event] if event else None)
+        chart = {'script': script, 'div': div}
+        cache.set(key, chart, PROGRESS_CACHE_TIMEOUT)
+    return chart
@@ -0,0 +1,157 @@
+"""
+Personal bests for swimmers and records for teams.
+
+The fastest result for each (swimmer, event) is stored in the PersonalBest table
+so records can be read with one query instead of sorting a swimmer's history
+for every event. Saving or deleting an Event updates its personal best (see
+teams.signals). Bulk inserts skip signals, so importers rebuild the personal
+bests of the swimmers they touched instead.
+
+Team records are found with one query for every event and gender at once.
+
+The base events intervals are calculated from (each swimmer's training base and
+100 time per stroke) are cached per team. The cache is cleared whenever one of
+the team's base or 100 results is saved or deleted.
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from teams.models import Event, PersonalBest, Rep, Swimmer, Team
+
+BASE_EVENTS = tuple(pace % stroke[0] for stroke in Rep.STROKE_CHOICE for pace in ('base %s', '100 %s'))
+BASE_CACHE_KEY = 'teams:bases:%s'
+
+def refresh_personal_best(swimmer_id, event):
+    """
+    Recalculates a swimmer's personal best in an event from their results.
+    """
+    best = Event.objects.filter(swimmer_id=swimmer_id, event=event).order_by('time', 'date', 'id').first()
+    if best:
+        PersonalBest.objects.update_or_create(
+            swimmer_id=swimmer_id,
+            event=event,
+            defaults={'result': best, 'time': best.time},
+        )
+    else:
+        PersonalBest.objects.filter(swimmer_id=swimmer_id, event=event).delete()
+
+
+def update_personal_best(result, created=False):
+    """
+    Updates personal bests after an Event is saved. A new result only has to be
+    compared to the current best, but an edited result that was a best may no
+    longer be one.
+    """
+    if not created:
+        stale = PersonalBest.objects.filter(result=result).exclude(
+            swimmer_id=result.swimmer_id, event=result.event)
+        for swimmer_id, event in stale.values_list('swimmer', 'event'):
+            refresh_personal_best(swimmer_id, event)
+
+    if not result.swimmer_id:
+        return
+
+    best = PersonalBest.objects.filter(swimmer_id=result.swimmer_id, event=result.event).first()
+    if best is None or result.time < best.time:
+        PersonalBest.objects.update_or_create(
+            swimmer_id=result.swimmer_id,
+            event=result.event,
+            defaults={'result': result, 'time': result.time},
+        )
+    elif best.result_id == result.pk and best.time != result.time:
+        refresh_personal_best(result.swimmer_id, result.event)
+
+
+def remove_personal_best(result):
+    """
+    Updates personal bests after an Event is deleted. Deleting a best also
+    deletes its PersonalBest, so the next fastest result takes its place.
+    """
+    if result.swimmer_id and not PersonalBest.objects.filter(
+            swimmer_id=result.swimmer_id, event=result.event).exists():
+        refresh_personal_best(result.swimmer_id, result.event)
+
+
+def rebuild_personal_bests(swimmers=None):
+    """
+    Recalculates the personal bests of the given swimmers (ids or a queryset),
+    or of every swimmer, from their results. Returns the number of personal
+    bests saved.
+    """
+    results = Event.objects.filter(swimmer__isnull=False)
+    personal_bests = PersonalBest.objects.all()
+    if swimmers is not None:
+        results = results.filter(swimmer__in=swimmers)
+        personal_bests = personal_bests.filter(swimmer__in=swimmers)
+
+    # results are sorted fastest first, so the first result seen for each
+    # swimmer and event is the best
+    bests = {}
+    for pk, swimmer_id, event, time in results.order_by(
+            'swimmer_id', 'event', 'time', 'date', 'id').values_list('id', 'swimmer', 'event', 'time'):
+        if (swimmer_id, event) not in bests:
+            bests[(swimmer_id, event)] = PersonalBest(
+                swimmer_id=swimmer_id, event=event, result_id=pk, time=time)
+
+    with transaction.atomic():
+        personal_bests.delete()
+        PersonalBest.objects.bulk_create(bests.values())
+
+    if swimmers is None:
+        team_ids = Team.objects.values_list('id', flat=True)
+    else:
+        team_ids = Swimmer.objects.filter(pk__in=swimmers).values_list('team', flat=True).distinct()
+    cache.delete_many([BASE_CACHE_KEY % team_id for team_id in team_ids])
+
+    return len(bests)
+
+
+def get_team_bases(team_id):
+    """
+    Returns a dict of each swimmer on the team's fastest base and 100 times,
+    {swimmer id: {event: time}}, from the cache or with one query.
+    """
+    key = BASE_CACHE_KEY % team_id
+    bases = cache.get(key)
+    if bases is None:
+        bases = {}
+        for swimmer_id, event, time in PersonalBest.objects.filter(
+                swimmer__team=team_id, event__in=BASE_EVENTS).values_list('swimmer', 'event', 'time'):
+            bases.setdefault(swimmer_id, {})[event] = time
+        cache.set(key, bases, None)
+    return bases
+
+
+def invalidate_team_bases(result):
+    """
+    Clears the cached bases for the team of a result's swimmer if the result is
+    a base or 100 time.
+    """
+    if result.swimmer_id and result.event in BASE_EVENTS:
+        team_id = Swimmer.objects.filter(pk=result.swimmer_id).values_list('team', flat=True).first()
+        cache.delete(BASE_CACHE_KEY % team_id)
+
+
+def get_team_bests(team, events=None):
+    """
+    Returns a dict of the team's fastest result for each (event, gender), found
+    with a single query. Databases that support DISTINCT ON (Postgres) keep the
+    first row of each group, others pick each group's fastest result with a
+    correlated subquery.
+    """
+    results = Event.objects.filter(team=team, gender__in=('M', 'F'))
+    if events is not None:
+        results = results.filter(event__in=events)
+
+    if connection.features.can_distinct_on_fields:
+        results = results.order_by('event', 'gender', 'time', 'id').distinct('event', 'gender')
+    else:
+        fastest = Event.objects.filter(
+            team=team,
+            event=OuterRef('event'),
+            gender=OuterRef('gender'),
+        ).order_by('time', 'id').values('pk')[:1]
+        results = results.filter(pk=Subquery(fastest))
+
+    return dict(((result.event, result.gender), result) for result in results)
@@ -0,0 +1,45 @@
+"""
+Cached practice schedules.
+
+The practice schedule page renders a week of a team's practices, with every
+set, rep, and interval, into an HTML fragment that is cached per (team, week).
+Saving or deleting one of the week's practices, sets, reps, or intervals, or
+changing the swimmers in a set, clears the fragment (see teams.signals), so
+repeat views of a week cost one cache lookup.
+"""
+from django.core.cache import cache
+
+from teams.models import Practice
+
+SCHEDULE_CACHE_KEY = 'teams:schedule:%s:%s'
+
+def get_schedule(team, week):
+    """
+    Returns the cached schedule fragment for a team's week or None.
+    """
+    return cache.get(SCHEDULE_CACHE_KEY % (team.id, week.id))
+
+
+def set_schedule(team, week, schedule):
+    """
+    Caches a team's rendered week until it changes.
+    """
+    cache.set(SCHEDULE_CACHE_KEY % (team.id, week.id), schedule, None)
+
+
+def invalidate_schedule(team_id, week_id):
+    """
+    Clears the cached schedule for a team's week.
+    """
+    cache.delete(SCHEDULE_CACHE_KEY % (team_id, week_id))
+
+
+def invalidate_practices(**filters):
+    """
+    Clears the cached schedules of the practices matching the filters, for
+    example set=<set id> or set__rep=<rep id>.
+    """
+    keys = [SCHEDULE_CACHE_KEY % (team_id, week_id) for team_id, week_id in
+        Practice.objects.filter(**filters).order_by().values_list('team', 'week_id').distinct()]
+    if keys:
+        cache.delete_many(keys)
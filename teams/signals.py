@@ -0,0 +1,71 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from teams.models import Event, Swimmer, Team, Practice, Set, Rep, Interval
+from teams import records, schedule
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        records.update_personal_best(instance, created)
+        records.invalidate_team_bases(instance)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    records.remove_personal_best(instance)
+    records.invalidate_team_bases(instance)
+
+
+# Practice schedules. Intervals are only deleted by calculate_intervals, which
+# clears the schedule itself, or along with their rep, so deleting them doesn't
+# need a receiver (which would stop Django deleting them in one query). The
+# same goes for swimmers, which deleteSwimmer and roster imports clear the
+# schedules of themselves, the latter once for every swimmer removed.
+
+@receiver(post_save, sender=Practice)
+@receiver(post_delete, sender=Practice)
+def practice_changed(sender, instance, **kwargs):
+    schedule.invalidate_schedule(instance.team_id, instance.week_id_id)
+
+
+@receiver(post_save, sender=Set)
+@receiver(post_delete, sender=Set)
+def set_changed(sender, instance, **kwargs):
+    schedule.invalidate_practices(pk=instance.practice_id_id)
+
+
+@receiver(post_save, sender=Rep)
+@receiver(post_delete, sender=Rep)
+def rep_changed(sender, instance, **kwargs):
+    schedule.invalidate_practices(set=instance.set_id_id)
+
+
+@receiver(post_save, sender=Interval)
+def interval_saved(sender, instance, **kwargs):
+    schedule.invalidate_practices(set__rep=instance.rep_id)
+
+
+@receiver(m2m_changed, sender=Set.swimmers.through)
+def set_swimmers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule.invalidate_practices(pk=instance.practice_id_id)
+    elif action in ('post_add', 'post_remove'):
+        schedule.invalidate_practices(set__in=pk_set)
+    elif action == 'pre_clear':
+        # a swimmer's sets are only known before they're cleared
+        schedule.invalidate_practices(set__swimmers=instance)
+
+
+# schedules show swimmers' names and links with the team's abbreviation
+@receiver(post_save, sender=Swimmer)
+def swimmer_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        schedule.invalidate_practices(set__swimmers=instance)
+
+
+@receiver(post_save, sender=Team)
+def team_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        schedule.invalidate_practices(team=instance)
@@ -0,0 +1,141 @@
+from __future__ import unicode_literals
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+
+import teams.tests.test_setup as test
+from teams import analytics
+from teams.models import Swimmer
+
+class TestAnalytics(TestCase):
+    def setUp(self):
+        self.user = test.create_user(username='user', password='password')
+        self.team = test.create_team(self.user)
+        self.henry = test.create_swimmer(self.team)
+        self.dave = test.create_swimmer(self.team, first='Dave', last='Thornton')
+        self.jane = test.create_swimmer(self.team, first='Jane', last='Doe', gender='F')
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_group_helpers(self):
+        """
+        Minimums, slopes, and ranks are computed for each group.
+        """
+        groups = np.array([0, 1, 0, 1, 0])
+        values = np.array([3.0, 5.0, 1.0, 4.0, 2.0])
+        self.assertEqual(analytics.group_min(values, groups, 3).tolist(), [1.0, 4.0, np.inf])
+        self.assertEqual(analytics.group_min(values, groups, 2, values > 1.5).tolist(), [2.0, 4.0])
+
+        slopes = analytics.group_slope(np.array([0.0, 0.0, 1.0, 2.0, 2.0]), values, groups, 3)
+        self.assertEqual(slopes[0], -0.5)
+        self.assertEqual(slopes[1], -0.5)
+        self.assertTrue(np.isnan(slopes[2]))
+
+        self.assertEqual(analytics.group_rank(values, groups).tolist(), [3, 2, 1, 1, 2])
+
+    def test_team_analytics(self):
+        """
+        Best and season best times, drops, rates, and ranks are computed for
+        each swimmer's events from one query and cached until results or
+        swimmers change.
+        """
+        test.create_event(self.henry, '50 free', timedelta(seconds=26), date=date(2017, 1, 1))
+        test.create_event(self.henry, '50 free', timedelta(seconds=24), date=date(2017, 1, 31))
+        test.create_event(self.henry, '50 free', timedelta(seconds=23.5), date=date(2017, 10, 1))
+        test.create_event(self.dave, '50 free', timedelta(seconds=23), date=date(2017, 2, 1))
+        test.create_event(self.jane, '50 free', timedelta(seconds=27), date=date(2017, 11, 1))
+        test.create_event(self.jane, '100 back', timedelta(seconds=70), date=date(2017, 11, 1))
+
+        with self.assertNumQueries(9): # 4 for the results and roster and 5 to cache them
+            results = analytics.get_team_analytics(self.team, date(2017, 12, 1))
+        with self.assertNumQueries(3):
+            self.assertEqual(analytics.get_team_analytics(self.team, date(2017, 12, 1)), results)
+
+        self.assertEqual([e['event'] for e in results], ['50 free', '100 back'])
+        free = results[0]
+        self.assertEqual([(s['name'], s['gender'], s['rank']) for s in free['swimmers']], [
+            ('Dave Thornton', 'M', 1),
+            ('Henry Gridley', 'M', 2),
+            ('Jane Doe', 'F', 1),
+        ])
+
+        henry = free['swimmers'][1]
+        self.assertEqual(henry['results'], 3)
+        self.assertEqual(henry['best'], timedelta(seconds=23.5))
+        self.assertEqual(henry['season_best'], timedelta(seconds=23.5))
+        self.assertEqual(henry['delta'], -0.5)
+        self.assertAlmostEqual(henry['drop'], 2.5 / 26 * 100)
+        self.assertLess(henry['rate'], 0)
+
+        dave = free['swimmers'][0]
+        self.assertEqual((dave['season_best'], dave['delta'], dave['drop'], dave['rate']), (None, None, 0.0, None))
+        self.assertAlmostEqual(free['avg_drop'], 2.5 / 26 * 100 / 3)
+
+        test.create_event(self.dave, '50 free', timedelta(seconds=22), date=date(2017, 11, 1))
+        results = analytics.get_team_analytics(self.team, date(2017, 12, 1))
+        self.assertEqual(results[0]['swimmers'][0]['delta'], -1.0)
+
+        # editing a swimmer, even with a bulk update, changes the analytics
+        self.dave.l_name = 'Smith'
+        self.dave.save()
+        Swimmer.objects.filter(pk=self.henry.pk).update(gender='F')
+        free = analytics.get_team_analytics(self.team, date(2017, 12, 1))[0]
+        self.assertEqual([(s['name'], s['gender'], s['rank']) for s in free['swimmers']], [
+            ('Dave Smith', 'M', 1),
+            ('Henry Gridley', 'F', 1),
+            ('Jane Doe', 'F', 2),
+        ])
+
+    def test_undated_results(self):
+        """
+        Results without a date are left out instead of skewing every trend.
+        """
+        test.create_event(self.henry, '50 free', timedelta(seconds=26), date=date(2017, 1, 1))
+        test.create_event(self.henry, '50 free', timedelta(seconds=25), date=date(2017, 2, 1))
+        test.create_event(self.dave, '50 free', timedelta(seconds=30), date=None)
+
+        results = analytics.get_team_analytics(self.team, date(2017, 3, 1))
+        henry, = results[0]['swimmers']
+        self.assertEqual(henry['results'], 2)
+        self.assertAlmostEqual(henry['rate'], -1.0 / 31 * analytics.RATE_DAYS)
+        self.assertEqual(henry['delta'], None)
+        self.assertAlmostEqual(henry['drop'], 1.0 / 26 * 100)
+
+    def test_unset_times(self):
+        """
+        Times of 0 are left out instead of dividing drops by zero.
+        """
+        test.create_event(self.henry, '50 free', timedelta(0), date=date(2017, 1, 1))
+        test.create_event(self.henry, '50 free', timedelta(seconds=26), date=date(2017, 1, 2))
+        test.create_event(self.henry, '50 free', timedelta(seconds=25), date=date(2017, 2, 1))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            free = analytics.get_team_analytics(self.team, date(2017, 3, 1))[0]
+        henry, = free['swimmers']
+        self.assertEqual(henry['results'], 2)
+        self.assertEqual(henry['best'], timedelta(seconds=25))
+        self.assertAlmostEqual(henry['drop'], 1.0 / 26 * 100)
+        self.assertAlmostEqual(free['avg_drop'], 1.0 / 26 * 100)
+
+    def test_analytics_view(self):
+        """
+        The analytics page shows each event's table. Other users can't see a
+        team's analytics.
+        """
+        test.create_event(self.henry, '50 free', timedelta(seconds=26), date=date(2017, 1, 1))
+        url = reverse('teams:teamAnalytics', kwargs={'abbr': self.team.abbr})
+
+        self.client.login(username='user', password='password')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['analytics'][0]['name'], '50 Freestyle')
+        self.assertContains(response, 'Henry Gridley')
+
+        test.create_user('user2', 'password')
+        self.client.login(username='user2', password='password')
+        self.assertEqual(self.client.get(url).status_code, 404)
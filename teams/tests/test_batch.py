@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+from unittest import TestCase
+import io, zipfile
+from datetime import date
+
+from teams import batch
+from teams.tests.test_hytek import RESULTS
+
+def zip_bytes(files):
+    """
+    Returns the contents of a zip file containing the given {file name: contents}.
+    """
+    buf = io.BytesIO()
+    zip_ref = zipfile.ZipFile(buf, 'w')
+    for file_name, contents in sorted(files.items()):
+        zip_ref.writestr(file_name, contents)
+    zip_ref.close()
+    return buf.getvalue()
+
+def meet_bytes(day):
+    """
+    Returns the contents of a meet results zip file for the given day in February.
+    """
+    lines = list(RESULTS)
+    lines[1] = lines[1].replace('0204201702042017', '02%02d201702%02d2017' % (day, day))
+    return zip_bytes({'MEET.HY3': '\r\n'.join(lines).encode('latin-1')})
+
+
+class TestBatch(TestCase):
+    def test_expand_archives(self):
+        """
+        Zip files nested in an archive are yielded separately.
+        """
+        meet1 = meet_bytes(4)
+        meet2 = meet_bytes(11)
+        season = zip_bytes({'Meet1-Results.zip': meet1, 'Meet2-Results.zip': meet2})
+        archives = list(batch.expand_archives([('Season.zip', season), ('Meet3-Results.zip', meet1)]))
+        self.assertEqual(archives, [
+            ('Meet1-Results.zip', meet1),
+            ('Meet2-Results.zip', meet2),
+            ('Meet3-Results.zip', meet1),
+        ])
+
+    def test_parse_results_archive(self):
+        """
+        Returns the records from each .HY3 file and any errors.
+        """
+        name, records, errors = batch.parse_results_archive(('Meet-Results.zip', meet_bytes(11)))
+        self.assertEqual(name, 'Meet-Results.zip')
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0].date, date(2017, 2, 11))
+        self.assertEqual(errors, [])
+
+        lines = list(RESULTS)
+        lines[1] = 'B1Northeastern Red vs. White'
+        data = zip_bytes({'MEET.HY3': '\r\n'.join(lines).encode('latin-1')})
+        self.assertEqual(batch.parse_results_archive(('Meet-Results.zip', data)),
+            ('Meet-Results.zip', [], ['Couldn\'t find meet date in Meet-Results.zip']))
+        self.assertEqual(batch.parse_results_archive(('Meet-Results.zip', zip_bytes({}))),
+            ('Meet-Results.zip', [], ['Couldn\'t find .HY3 file in Meet-Results.zip']))
+
+    def test_parse_archives_in_parallel(self):
+        """
+        Archives parsed by a pool of processes are returned in order.
+        """
+        archives = [('Meet%d-Results.zip' % day, meet_bytes(day)) for day in range(1, 5)]
+        parsed = batch.parse_archives(archives, workers=2)
+        self.assertEqual([p[0] for p in parsed], [a[0] for a in archives])
+        self.assertEqual([p[1][0].date for p in parsed], [date(2017, 2, day) for day in range(1, 5)])
+        self.assertEqual(parsed, batch.parse_archives(archives, workers=1))
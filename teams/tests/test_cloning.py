@@ -0,0 +1,116 @@
+from __future__ import unicode_literals
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+
+import teams.tests.test_setup as test
+from teams.models import Week, Practice, Set, Rep, Interval
+from teams import cloning, schedule
+
+class TestCloning(TestCase):
+    def setUp(self):
+        self.user = test.create_user(username='user', password='password')
+        self.team = test.create_team(self.user)
+        self.swimmer = test.create_swimmer(self.team)
+        test.create_event(self.swimmer, 'base free', timedelta(seconds=25))
+        training_model = test.create_training_model(self.team)
+        test.create_training_multiplier(training_model, multiplier=0.07)
+        self.week = test.create_week(monday=date(2017, 7, 10))
+
+    def tearDown(self):
+        self.user.delete()
+        cache.clear()
+
+    def create_practice(self, week, weekday='monday', distance=100):
+        practice = test.create_practice(self.team, week, weekday=weekday)
+        warmup = test.create_set(practice, order=1, swimmers=[self.swimmer])
+        test.create_rep(warmup, distance=distance)
+        test.create_rep(warmup, distance=distance * 2)
+        kick = test.create_set(practice, focus='kick', order=2, swimmers=[self.swimmer])
+        test.create_rep(kick, distance=50, rest=timedelta(seconds=10))
+        return practice
+
+    def test_clone_practice(self):
+        """
+        Copies the sets, swimmers, and reps of a practice and recalculates the
+        intervals of sets without rest.
+        """
+        practice = self.create_practice(self.week)
+        target = test.create_week(monday=date(2017, 7, 17))
+
+        new = cloning.clone_practice(practice, target, 'tuesday')
+
+        self.assertEqual((new.team, new.week_id, new.weekday), (self.team, target, 'tuesday'))
+        sets = list(Set.objects.filter(practice_id=new))
+        self.assertEqual([(s.focus, s.order) for s in sets], [('warmup', 1), ('kick', 2)])
+        self.assertEqual([list(s.swimmers.all()) for s in sets], [[self.swimmer], [self.swimmer]])
+        self.assertEqual(sorted(r.distance for r in Rep.objects.filter(set_id=sets[0])), [100, 200])
+        self.assertEqual(sorted(i.time.total_seconds() for i in Interval.objects.filter(rep__set_id=sets[0])),
+            [55, 110])
+        self.assertFalse(Interval.objects.filter(rep__set_id=sets[1]).exists())
+        self.assertEqual(Set.objects.filter(practice_id=practice).count(), 2)
+
+    def test_clone_week(self):
+        """
+        Copies every practice in a week with a constant number of queries,
+        replacing practices already on those days and clearing the target
+        week's cached schedule.
+        """
+        for weekday in ['monday', 'wednesday', 'friday']:
+            self.create_practice(self.week, weekday=weekday)
+        target = test.create_week(monday=date(2017, 7, 17))
+        replaced = self.create_practice(target, 'monday', distance=400)
+        kept = test.create_practice(self.team, target, 'sunday')
+        schedule.set_schedule(self.team, target, 'cached')
+
+        with self.assertNumQueries(47):
+            practices = cloning.clone_week(self.team, self.week, target)
+
+        self.assertEqual([p.weekday for p in practices], ['monday', 'wednesday', 'friday'])
+        self.assertFalse(Practice.objects.filter(pk=replaced.pk).exists())
+        self.assertEqual(Practice.objects.filter(week_id=target).count(), 4)
+        self.assertTrue(Practice.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(Set.objects.filter(practice_id__week_id=target).count(), 6)
+        self.assertEqual(Interval.objects.filter(rep__set_id__practice_id__week_id=target).count(), 6)
+        self.assertIsNone(schedule.get_schedule(self.team, target))
+
+    def test_clone_cycle(self):
+        """
+        Copies a range of weeks back to back onto later weeks, creating the
+        weeks that don't exist yet.
+        """
+        second = test.create_week(monday=date(2017, 7, 17))
+        self.create_practice(self.week, 'monday')
+        self.create_practice(second, 'thursday')
+
+        practices = cloning.clone_cycle(self.team, date(2017, 7, 12), date(2017, 7, 20),
+            date(2017, 8, 2), repeats=3)
+
+        self.assertEqual([(p.week_id.monday, p.weekday) for p in practices], [
+            (date(2017, 7, 31), 'monday'), (date(2017, 8, 7), 'thursday'),
+            (date(2017, 8, 14), 'monday'), (date(2017, 8, 21), 'thursday'),
+            (date(2017, 8, 28), 'monday'), (date(2017, 9, 4), 'thursday'),
+        ])
+        self.assertEqual(Week.objects.count(), 8)
+        self.assertEqual(Set.objects.count(), 16)
+        self.assertEqual(Interval.objects.count(), 12)
+        self.assertEqual(cloning.clone_cycle(self.team, date(2017, 7, 20), date(2017, 7, 12), date(2017, 8, 2)), [])
+
+        out = StringIO()
+        call_command('copy_practices', self.team.abbr, '--start=2017-07-10', '--to=2017-09-11', stdout=out)
+        self.assertIn('Copied 1 practice(s)', out.getvalue())
+        self.assertTrue(Practice.objects.filter(week_id__monday=date(2017, 9, 11), weekday='monday').exists())
+
+        # commands need --user when more than one coach uses the abbreviation
+        test.create_team(test.create_user('user2', 'password'))
+        with self.assertRaisesMessage(CommandError, 'use --user'):
+            call_command('copy_practices', self.team.abbr, '--start=2017-07-10', '--to=2017-09-18')
+        with self.assertRaisesMessage(CommandError, 'does not exist'):
+            call_command('copy_practices', 'XYZ', '--start=2017-07-10', '--to=2017-09-18')
+        call_command('copy_practices', self.team.abbr, '--user=user', '--start=2017-07-10',
+            '--to=2017-09-18', stdout=out)
+        self.assertTrue(Practice.objects.filter(week_id__monday=date(2017, 9, 18), team=self.team).exists())
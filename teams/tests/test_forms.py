@@ -272,6 +272,24 @@ class TestSetForm(TestCase):
         self.assertEqual(setInstance.group, 'team')
         self.assertQuerysetEqual(setInstance.swimmers.all(), [])
 
+    def test_set_form_team_group(self):
+        """
+        A team set includes every swimmer on the team, added with a constant
+        number of queries whatever the size of the roster.
+        """
+        swimmers = [test.create_swimmer(self.team, first='Swimmer %d' % n) for n in range(20)]
+        form = SetForm({
+            'pace': 'train',
+            'focus': 'warmup',
+            'order': 1,
+            'group': 'team',
+            'swimmers': [swimmers[0].id],
+        }, practice=self.practice, team=self.team)
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(13):
+            setInstance = form.save()
+        self.assertEqual(set(setInstance.swimmers.all()), set(swimmers))
+
     def test_set_form_invalid_data(self):
         """
         SetForm will not validate without a focus and order.
@@ -3,11 +3,14 @@ from unittest import skip, skipIf, skipUnless
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils.six import StringIO
 
 import teams.tests.test_setup as test
 from teams.models import Week, Practice, Interval
 import teams.functions as funct
+from teams.records import get_team_bases
 
 
 class TestFunctions(TestCase):
@@ -149,6 +152,28 @@ class TestFunctions(TestCase):
         self.assertEqual(weeks['previous'].monday, previous_week.monday)
         self.assertEqual(weeks['next'].monday, next_week.monday)
 
+    def test_get_or_create_weeks_queries(self):
+        """
+        The current week is looked up by date without checking every week, and
+        the present flags are only updated when the current week changes.
+        """
+        for n in range(1, 53):
+            test.create_week(monday=funct.get_monday() - timedelta(weeks=n)).populate()
+        last_week = Week.objects.get(monday=funct.get_monday(None, 0))
+        last_week.present = True
+        last_week.save()
+        current_week = test.create_week(monday=funct.get_monday())
+        current_week.populate()
+        test.create_week(monday=funct.get_monday(None, 1)).populate()
+
+        weeks = funct.get_or_create_weeks(0)
+        self.assertEqual(weeks['current'], current_week)
+        self.assertEqual(list(Week.objects.filter(present=True)), [current_week])
+
+        with self.assertNumQueries(1):
+            weeks = funct.get_or_create_weeks(0)
+        self.assertEqual(weeks['current'], current_week)
+
     def test_get_practices_and_dates(self):
         """
         Returns a list of practices and a list of dates.
@@ -192,6 +217,39 @@ class TestFunctions(TestCase):
             ('saturday', test_dates[5]),
         ])
 
+    def test_get_practices_and_dates_queries(self):
+        """
+        The number of queries doesn't grow with the number of sets, swimmers,
+        and reps, and duplicate practices for a day are deleted.
+        """
+        weeks = funct.get_or_create_weeks(0)
+        team = test.create_team(user=self.user)
+        swimmers = [test.create_swimmer(team, first='Swimmer', last=str(i)) for i in range(5)]
+        for day in ['monday', 'wednesday', 'friday']:
+            practice = test.create_practice(team, weeks['current'], weekday=day)
+            for order in range(3):
+                setInstance = test.create_set(practice=practice, order=order, swimmers=swimmers)
+                for stroke in ['free', 'back']:
+                    rep = test.create_rep(setInstance, stroke=stroke)
+                    for swimmer in swimmers:
+                        Interval.objects.create(swimmer=swimmer, rep=rep, time=timedelta(seconds=60))
+        duplicate = test.create_practice(team, weeks['current'], weekday='monday')
+
+        funct.get_practices_and_dates(team, weeks)
+        self.assertFalse(Practice.objects.filter(pk=duplicate.pk).exists())
+
+        with self.assertNumQueries(6):
+            practices, dates = funct.get_practices_and_dates(team, weeks)
+
+        with self.assertNumQueries(0):
+            for (practice, practice_sets), day in practices:
+                if practice:
+                    for setInstance, set_swimmers in practice_sets:
+                        list(setInstance.rep_set.all())
+                        for swimmer, reps in set_swimmers:
+                            for rep, interval in reps:
+                                self.assertEqual(interval.time, timedelta(seconds=60))
+
     def test_calculate_intervals(self):
         """
         Calculates intervals for a set and returns nothing.
@@ -218,6 +276,80 @@ class TestFunctions(TestCase):
         self.assertEqual(intervals[0].time, timedelta(seconds=55))
         self.assertEqual(intervals[1].time, timedelta(seconds=55))
 
+    def test_calculate_intervals_bulk(self):
+        """
+        Intervals for every swimmer and rep are saved with a fixed number of
+        queries, replacing old intervals. Race intervals are based on half the
+        swimmer's 100 time and swimmers without a base get a 0 interval.
+        """
+        week = test.create_week()
+        team = test.create_team(self.user)
+        swimmers = [test.create_swimmer(team, first='Swimmer', last=str(i)) for i in range(4)]
+        for i, swimmer in enumerate(swimmers[:3]):
+            test.create_event(swimmer, '100 free', timedelta(seconds=50 + i))
+            test.create_event(swimmer, '100 back', timedelta(seconds=55 + i))
+
+        training_model = test.create_training_model(team)
+        test.create_training_multiplier(training_model, multiplier=0.07)
+        practice = test.create_practice(team, week)
+        setInstance = test.create_set(practice, pace='race', swimmers=swimmers)
+        free = test.create_rep(setInstance, distance=100, stroke='free')
+        back = test.create_rep(setInstance, distance=200, stroke='back')
+        old = Interval.objects.create(swimmer=swimmers[0], rep=free, time=timedelta(seconds=90))
+
+        get_team_bases(team.id) # warm the cache
+        with self.assertNumQueries(10):
+            funct.calculate_intervals(setInstance, training_model)
+
+        self.assertFalse(Interval.objects.filter(pk=old.pk).exists())
+        intervals = dict(((i.swimmer_id, i.rep_id), i.time.total_seconds()) for i in Interval.objects.all())
+        self.assertEqual(len(intervals), 8)
+        # 1.07 * 25 * 2 = 53.5 and 1.07 * 27.5 * 4 = 117.7, truncated
+        self.assertEqual(intervals[(swimmers[0].id, free.id)], 53)
+        self.assertEqual(intervals[(swimmers[0].id, back.id)], 117)
+        self.assertEqual(intervals[(swimmers[2].id, free.id)], 55)
+        self.assertEqual(intervals[(swimmers[3].id, free.id)], 0)
+        self.assertEqual(intervals[(swimmers[3].id, back.id)], 0)
+
+    def test_recalculate_intervals(self):
+        """
+        Intervals for sets in practices within the date range are recalculated
+        with the current training model, reporting progress after each chunk.
+        Sets with rest don't get intervals.
+        """
+        team = test.create_team(self.user)
+        swimmer = test.create_swimmer(team)
+        test.create_event(swimmer, 'base free', timedelta(seconds=25))
+        week1 = test.create_week(monday=date(2017, 7, 10))
+        week2 = test.create_week(monday=date(2017, 7, 17))
+        reps = []
+        for week, weekday in [(week1, 'monday'), (week1, 'sunday'), (week2, 'monday'), (week2, 'friday')]:
+            practice = test.create_practice(team, week, weekday=weekday)
+            setInstance = test.create_set(practice, swimmers=[swimmer])
+            reps.append(test.create_rep(setInstance))
+            test.create_interval(swimmer, reps[-1], time=timedelta(seconds=90))
+        rest_set = test.create_set(practice, order=2, swimmers=[swimmer])
+        rest_reps = [test.create_rep(rest_set), test.create_rep(rest_set, rest=timedelta(seconds=10))]
+
+        self.assertIsNone(funct.recalculate_intervals(team))
+        training_model = test.create_training_model(team)
+        test.create_training_multiplier(training_model, multiplier=0.07)
+
+        progress = []
+        count = funct.recalculate_intervals(team, date(2017, 7, 16), date(2017, 7, 17),
+            chunk_size=1, progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(count, 2)
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        times = [Interval.objects.get(rep=rep).time.total_seconds() for rep in reps]
+        self.assertEqual(times, [90, 55, 55, 90])
+
+        out = StringIO()
+        call_command('recalculate_intervals', team.abbr, stdout=out)
+        self.assertIn('Recalculated intervals for 4 set(s)', out.getvalue())
+        times = [Interval.objects.get(rep=rep).time.total_seconds() for rep in reps]
+        self.assertEqual(times, [55, 55, 55, 55])
+        self.assertFalse(Interval.objects.filter(rep__in=rest_reps).exists())
+
     def test_get_zipped_set(self):
         """
         Returns list of tuples containing the rep, swimmer, and interval.
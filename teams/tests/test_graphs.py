@@ -19,3 +19,48 @@ class TestGraphs(TestCase):
 
     def test_event_graph(self):
         graph_event(self.swimmer)
+
+    def test_get_event_columns(self):
+        """
+        Returns the columns for each event with more than one result, in date
+        order, with one query.
+        """
+        test.create_event(self.swimmer, '100 free', timedelta(seconds=50.5), date=date(2017, 2, 1))
+        test.create_event(self.swimmer, '50 free', timedelta(seconds=24), date=date(2017, 2, 1))
+        test.create_event(self.swimmer, '50 free', timedelta(seconds=61.25), date=date(2017, 1, 1))
+        test.create_event(self.swimmer, '100 back', timedelta(seconds=60), date=date(2017, 1, 1))
+        test.create_event(self.swimmer, '100 free', timedelta(seconds=51), date=date(2017, 1, 1))
+
+        with self.assertNumQueries(1):
+            columns = get_event_columns(self.swimmer)
+
+        self.assertEqual(list(columns), ['50 free', '100 free'])
+        self.assertEqual(columns['50 free'], {
+            'x': [date(2017, 1, 1), date(2017, 2, 1)],
+            'y': [61.25, 24.0],
+            'date': ['01/01/17', '02/01/17'],
+            'time': ['1:1.25', '0:24.00'],
+        })
+        self.assertEqual(event_key('Base IM'), 'base_im')
+
+    def test_event_sources(self):
+        """
+        Each event gets its own data source at its own length with the x and y
+        columns sent as base64 encoded arrays.
+        """
+        self.assertEqual(graph_event(self.swimmer), (None, None))
+
+        for day in range(1, 4):
+            test.create_event(self.swimmer, '50 free', timedelta(seconds=24 + day), date=date(2017, 1, day))
+        for day in range(1, 3):
+            test.create_event(self.swimmer, '100 im', timedelta(seconds=60 + day), date=date(2017, 1, day))
+
+        sources = get_event_sources(self.swimmer)
+        self.assertEqual(list(sources), ['50 free', '100 im'])
+        self.assertEqual(list(sources['50 free'].data['y']), [25, 26, 27])
+        self.assertEqual(len(sources['100 im'].data['x']), 2)
+
+        script, div = graph_event(self.swimmer)
+        self.assertIn('source_100_im', script)
+        self.assertIn('__ndarray__', script)
+        self.assertIn('CoachMate.charts.selectEvent(source, cb_obj);', script)
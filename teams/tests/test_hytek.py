@@ -0,0 +1,75 @@
+from __future__ import unicode_literals
+from unittest import TestCase
+import os
+from datetime import date, timedelta
+
+from teams import hytek
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_files')
+
+RESULTS = [
+    'A107Results From MM to TM    Hy-Tek, Ltd    MM5 7.0Fa     02062017  2:17 PMNortheastern University',
+    'B1Northeastern Red vs. White                                   Cabot Center         0204201702042017',
+    'C1NE   Northeastern University         AGENE                                                      ',
+    'D1M    12Gridley             Henry               Henry                 0921199620',
+    'E1M    12Gridl MM    50C  0  1  0.00 0 0 0    0.00Y    0.00Y',
+    'E2F    35.88Y      7   0 0   0  0 0   0.00   0.00                          0',
+    'E1M    12Gridl MM    50A  0  1  0.00 0 0 0    0.00Y    0.00Y',
+    'E2F    23.34Y      1   0 0   0  0 0   0.00   0.00                          0',
+    'E1M    12Gridl MM   100A  0  1  0.00 0 0 0    0.00Y    0.00Y',
+    'E2F     0.00Y      X   0 0   0  0 0   0.00   0.00                          0',
+    'D1F    13Doe                 Jane                Jane                  0101199821',
+    'E1F    13Doe   FF   100D  0  1  0.00 0 0 0    0.00Y    0.00Y',
+    'E2F    61.02Y      X   0 0   0  0 0   0.00   0.00                          0',
+    'E1F    13Doe   FF   200B  0  1  0.00 0 0 0    0.00Y    0.00Y',
+    'E2F    NT                                                                  0',
+]
+
+
+class TestHyTekParser(TestCase):
+    def test_iter_roster_cl2(self):
+        """
+        Yields a roster record for each swimmer record in a .CL2 file.
+        """
+        with open(os.path.join(TEST_FILES, 'CFILE01.CL2'), 'r') as f:
+            records = list(hytek.iter_roster(f, '.CL2'))
+
+        self.assertEqual(len(records), 74)
+        self.assertEqual(records[0], hytek.RosterRecord('Casey', 'Abel', 'F', date(1996, 4, 23)))
+        self.assertEqual(records[-1], hytek.RosterRecord('Shelbe', 'Van Winkle', 'F', date(1995, 2, 5)))
+
+    def test_iter_roster_hy3(self):
+        """
+        Yields a roster record for each swimmer record in a .HY3 file and an error
+        record for any swimmer that can't be read.
+        """
+        lines = RESULTS[:4] + ['D1M    14                             0101199821']
+        records = list(hytek.iter_roster(lines, '.hy3'))
+
+        self.assertEqual(records, [
+            hytek.RosterRecord('Henry', 'Gridley', 'M', date(1996, 9, 21)),
+            hytek.ErrorRecord(lines[4], None, None),
+        ])
+
+    def test_iter_results(self):
+        """
+        Yields a result record for each swim with a time and an error record for
+        any swim that can't be read.
+        """
+        records = list(hytek.iter_results(RESULTS))
+
+        self.assertEqual(records, [
+            hytek.ResultRecord('Henry', 'Gridley', 'M', '50 breast', timedelta(seconds=35.88), 7, date(2017, 2, 4)),
+            hytek.ResultRecord('Henry', 'Gridley', 'M', '50 free', timedelta(seconds=23.34), 1, date(2017, 2, 4)),
+            hytek.ResultRecord('Jane', 'Doe', 'F', '100 fly', timedelta(seconds=61.02), None, date(2017, 2, 4)),
+            hytek.ErrorRecord(RESULTS[14], 'Jane', 'Doe'),
+        ])
+
+    def test_iter_results_without_meet_date(self):
+        """
+        Raises an error if the meet date can't be found.
+        """
+        lines = list(RESULTS)
+        lines[1] = 'B1Northeastern Red vs. White                                   Cabot Center'
+        with self.assertRaises(hytek.MeetDateError):
+            list(hytek.iter_results(lines))
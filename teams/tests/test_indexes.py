@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+from unittest import skipUnless
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+
+import teams.tests.test_setup as test
+from teams.models import *
+
+def explain(queryset):
+    """
+    Returns the database's query plan for a queryset as a string.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # the tables are tiny in tests, so stop the planner preferring a
+            # sequential scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+
+@skipUnless(connection.vendor in ('postgresql', 'sqlite'), 'Query plans are only checked on Postgres and SQLite')
+class TestQueryPlans(TestCase):
+    def setUp(self):
+        self.user = test.create_user(username='user', password='password')
+        self.team = test.create_team(self.user)
+        self.swimmer = test.create_swimmer(self.team)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def assertUsesIndex(self, queryset, index):
+        plan = explain(queryset)
+        self.assertIn(index, plan, 'Expected %s to be used:\n%s' % (index, plan))
+
+    def test_team_record_index(self):
+        """
+        Team records are found with the (team, event, gender, time) index.
+        """
+        records = Event.objects.filter(team=self.team, event='50 free', gender='M').order_by('time')
+        self.assertUsesIndex(records, 'event_team_record_idx')
+
+    def test_personal_best_index(self):
+        """
+        Personal bests are found with the (swimmer, event, time, date) index.
+        """
+        results = Event.objects.filter(swimmer=self.swimmer, event='50 free').order_by('time', 'date')
+        self.assertUsesIndex(results, 'event_swimmer_best_idx')
+
+    def test_interval_index(self):
+        """
+        A swimmer's interval for a rep is found with the (rep, swimmer) index.
+        """
+        practice = test.create_practice(self.team, test.create_week())
+        rep = test.create_rep(test.create_set(practice=practice))
+        intervals = Interval.objects.filter(rep=rep, swimmer=self.swimmer)
+        self.assertUsesIndex(intervals, 'interval_rep_swimmer_idx')
+
+    def test_practice_index(self):
+        """
+        A team's practice on a day is found with the (team, week, weekday) index.
+        """
+        week = test.create_week()
+        practices = Practice.objects.filter(team=self.team, week_id=week, weekday='monday')
+        self.assertUsesIndex(practices, 'practice_schedule_idx')
+
+    def test_swimmer_index(self):
+        """
+        Roster imports match swimmers with the roster index.
+        """
+        swimmers = Swimmer.objects.filter(team=self.team, l_name='Gridley', f_name='Henry',
+            gender='M', birth_date=date(1996, 9, 21))
+        self.assertUsesIndex(swimmers, 'swimmer_roster_idx')
+
+    def test_week_index(self):
+        """
+        The current week is found with the index on Monday's date.
+        """
+        weeks = Week.objects.filter(monday__gt=date(2017, 7, 5), monday__lte=date(2017, 7, 12))
+        self.assertUsesIndex(weeks, 'teams_week_monday')
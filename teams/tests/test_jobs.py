@@ -0,0 +1,82 @@
+from __future__ import unicode_literals
+from datetime import timedelta
+from unittest import skip, skipIf, skipUnless
+
+from django.test import TestCase
+from django.utils import timezone
+
+import teams.tests.test_setup as test
+from teams.models import ImportJob
+import teams.jobs as jobs
+
+class TestJobs(TestCase):
+    def setUp(self):
+        self.user = test.create_user('user', 'password')
+        self.team = test.create_team(self.user)
+
+    def tearDown(self):
+        self.user.delete()
+        self.team.delete()
+
+    def test_enqueue_import(self):
+        """
+        An uploaded file is stored as a queued job with the import type taken from
+        the file name.
+        """
+        zip_file = test.create_zip_file('NUSC-NE-Results001.zip', {'MEET.HY3': b''})
+        job = jobs.enqueue_import(self.team, zip_file)
+        self.assertEqual(job.kind, 'results')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.progress, 0)
+        self.assertEqual(jobs.get_import_kind('Meet.zip'), None)
+
+    def test_claim_job(self):
+        """
+        The oldest queued job is claimed and marked as running.
+        """
+        job1 = ImportJob.objects.create(team=self.team, kind='roster', file_name='Roster1.zip')
+        job2 = ImportJob.objects.create(team=self.team, kind='roster', file_name='Roster2.zip')
+        self.assertEqual(jobs.claim_job(), job1)
+        self.assertEqual(jobs.claim_job(), job2)
+        self.assertEqual(jobs.claim_job(), None)
+        job1.refresh_from_db()
+        self.assertEqual(job1.status, 'running')
+
+    def test_stalled_jobs(self):
+        """
+        Running jobs that haven't been updated within the timeout are marked as
+        failed when the next job is claimed. Other running jobs are left alone.
+        """
+        stalled = ImportJob.objects.create(team=self.team, kind='roster', file_name='Roster1.zip',
+            status='running', data=b'data')
+        running = ImportJob.objects.create(team=self.team, kind='roster', file_name='Roster2.zip',
+            status='running')
+        ImportJob.objects.filter(pk=stalled.pk).update(
+            updated=timezone.now() - jobs.JOB_TIMEOUT - timedelta(minutes=1))
+
+        self.assertEqual(jobs.claim_job(), None)
+        stalled.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((stalled.status, stalled.progress, bytes(stalled.data)), ('failed', 100, b''))
+        self.assertEqual(stalled.get_messages(),
+            [('error', 'Import stopped before it finished - upload the file again')])
+        self.assertEqual(running.status, 'running')
+
+    def test_run_pending(self):
+        """
+        Queued jobs are run and their messages are stored. A job that raises an
+        error is marked as failed.
+        """
+        jobs.enqueue_import(self.team, test.create_zip_file('NUSC-NE-Roster001.zip', {
+            'CFILE01.CL2': open(test.TEST_CL2_FILE, 'rb').read(),
+        }))
+        ImportJob.objects.create(team=self.team, kind='roster', file_name='Roster.zip', data=b'not a zip file')
+
+        self.assertEqual(jobs.run_pending(), 2)
+        job1, job2 = ImportJob.objects.all()
+        self.assertEqual(job1.status, 'done')
+        self.assertEqual(job1.progress, 100)
+        self.assertEqual(job1.get_messages(), [('success', 'Roster imported')])
+        self.assertEqual(job2.status, 'failed')
+        self.assertEqual(job2.get_messages(), [('error', 'Couldn\'t import Roster.zip')])
+        self.assertEqual(self.team.swimmer_set.count(), 74)
@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+from unittest import TestCase
+from datetime import timedelta
+
+import numpy as np
+
+from teams import pace
+
+class TestPace(TestCase):
+    def test_round_send_off(self):
+        """
+        Times are rounded down to whole seconds then up to the send-off.
+        """
+        times = [53.5, 55.0, 56.2, 60.9999999]
+        self.assertEqual(pace.round_send_off(times, 1).tolist(), [53, 55, 56, 61])
+        self.assertEqual(pace.round_send_off(times, 5).tolist(), [55, 55, 60, 65])
+        self.assertEqual(pace.round_send_off(times, 10).tolist(), [60, 60, 60, 70])
+        self.assertEqual(pace.round_send_off(times, 15).tolist(), [60, 60, 60, 75])
+        self.assertTrue(np.isnan(pace.round_send_off(np.nan)))
+        with self.assertRaises(ValueError):
+            pace.round_send_off(times, 3)
+
+    def test_calculate(self):
+        """
+        Returns intervals for every swimmer and rep, matching the intervals found
+        one at a time by adding a second until they end in :00 or :05.
+        """
+        def loop_interval(base, distance, multiplier):
+            time = timedelta(seconds=((1 + multiplier) * base))
+            time = timedelta(seconds=((distance // 50) * time.total_seconds()))
+            time = timedelta(seconds=int(time.total_seconds()))
+            while int(time.total_seconds() % 5):
+                time += timedelta(seconds=1)
+            return time.total_seconds()
+
+        bases = [[25.0], [27.3], [31.9]]
+        distances = [50, 75, 100, 200, 500]
+        intervals = pace.calculate(bases, distances, 0.07)
+        self.assertEqual(intervals.shape, (3, 5))
+        self.assertEqual(intervals.tolist(),
+            [[loop_interval(b[0], d, 0.07) for d in distances] for b in bases])
+
+    def test_calculate_scaling(self):
+        """
+        Stroke and distance scales are applied before rounding.
+        """
+        intervals = pace.calculate([[30.0, 30.0, 30.0]], [100, 100, 200], 0.1,
+            send_off=1, strokes=['free', 'fly', 'fly'],
+            stroke_scale={'fly': 1.1}, distance_scale={200: 1.05})
+        self.assertEqual(intervals.tolist(), [[66, 72, 152]])
+
+    def test_calculate_pace(self):
+        """
+        Race intervals use half the 100 time and whole second send-offs.
+        """
+        intervals = pace.calculate_pace([[50.0, np.nan]], [100, 100], 0.07, 'race')
+        self.assertEqual(intervals[0, 0], 53)
+        self.assertTrue(np.isnan(intervals[0, 1]))
+        self.assertEqual(pace.calculate_pace([[25.0]], [100], 0.07, 'train').tolist(), [[55]])
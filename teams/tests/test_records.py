@@ -0,0 +1,214 @@
+from __future__ import unicode_literals
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+import teams.tests.test_setup as test
+import teams.functions as funct
+from teams.models import Event, PersonalBest
+from teams.TeamManager import TeamManager
+from teams.tests.test_hytek import RESULTS
+from teams import records
+
+class TestPersonalBests(TestCase):
+    def setUp(self):
+        self.user = test.create_user(username='user', password='password')
+        self.team = test.create_team(self.user)
+        self.swimmer = test.create_swimmer(self.team)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def get_bests(self, swimmer=None):
+        return list((swimmer or self.swimmer).personalbest_set.values_list('event', 'result', 'time'))
+
+    def test_saving_results(self):
+        """
+        A new result replaces the personal best only if it's faster.
+        """
+        slow = test.create_event(self.swimmer, time=timedelta(seconds=23))
+        self.assertEqual(self.get_bests(), [('50 free', slow.id, timedelta(seconds=23))])
+
+        fast = test.create_event(self.swimmer, time=timedelta(seconds=22))
+        test.create_event(self.swimmer, time=timedelta(seconds=24))
+        self.assertEqual(self.get_bests(), [('50 free', fast.id, timedelta(seconds=22))])
+
+    def test_editing_results(self):
+        """
+        Editing a personal best so it's slower or in another event or for another
+        swimmer makes the next fastest result the personal best.
+        """
+        other = test.create_swimmer(self.team, first='Jane', last='Doe', gender='F')
+        slow = test.create_event(self.swimmer, time=timedelta(seconds=23))
+        fast = test.create_event(self.swimmer, time=timedelta(seconds=22))
+
+        fast.time = timedelta(seconds=25)
+        fast.save()
+        self.assertEqual(self.get_bests(), [('50 free', slow.id, timedelta(seconds=23))])
+
+        slow.event = '100 free'
+        slow.save()
+        self.assertEqual(self.get_bests(), [
+            ('100 free', slow.id, timedelta(seconds=23)),
+            ('50 free', fast.id, timedelta(seconds=25)),
+        ])
+
+        slow.swimmer = other
+        slow.save()
+        self.assertEqual(self.get_bests(), [('50 free', fast.id, timedelta(seconds=25))])
+        self.assertEqual(self.get_bests(other), [('100 free', slow.id, timedelta(seconds=23))])
+
+    def test_deleting_results(self):
+        """
+        Deleting a personal best makes the next fastest result the personal best.
+        """
+        slow = test.create_event(self.swimmer, time=timedelta(seconds=23))
+        fast = test.create_event(self.swimmer, time=timedelta(seconds=22))
+
+        fast.delete()
+        self.assertEqual(self.get_bests(), [('50 free', slow.id, timedelta(seconds=23))])
+        slow.delete()
+        self.assertEqual(self.get_bests(), [])
+
+        test.create_event(self.swimmer)
+        self.swimmer.delete()
+        self.assertFalse(PersonalBest.objects.exists())
+
+    def test_imported_results(self):
+        """
+        Results imported in bulk update the personal bests.
+        """
+        old = test.create_event(self.swimmer, event='50 breast', time=timedelta(seconds=34))
+        TeamManager(team=self.team).parse_results(RESULTS)
+
+        fifty_free = Event.objects.get(swimmer=self.swimmer, event='50 free')
+        self.assertEqual(self.get_bests(), [
+            ('50 breast', old.id, timedelta(seconds=34)),
+            ('50 free', fifty_free.id, timedelta(seconds=23.34)),
+        ])
+
+    def test_rebuild_personal_bests(self):
+        """
+        Personal bests are recalculated from results, including results changed
+        without sending signals.
+        """
+        other = test.create_swimmer(self.team, first='Jane', last='Doe', gender='F')
+        slow = test.create_event(self.swimmer, time=timedelta(seconds=23))
+        fast = test.create_event(self.swimmer, time=timedelta(seconds=22))
+        other_event = test.create_event(other, time=timedelta(seconds=26))
+        Event.objects.filter(pk=fast.pk).update(time=timedelta(seconds=24))
+
+        self.assertEqual(records.rebuild_personal_bests([self.swimmer.id]), 1)
+        self.assertEqual(self.get_bests(), [('50 free', slow.id, timedelta(seconds=23))])
+        self.assertEqual(self.get_bests(other), [('50 free', other_event.id, timedelta(seconds=26))])
+
+        PersonalBest.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_personal_bests', self.team.abbr, stdout=out)
+        self.assertEqual(out.getvalue(), 'Saved 2 personal best(s)\n')
+        self.assertEqual(self.get_bests(), [('50 free', slow.id, timedelta(seconds=23))])
+
+    def test_swimmer_records_query(self):
+        """
+        A swimmer's records are read in one query.
+        """
+        best = test.create_event(self.swimmer, event='100 fly', time=timedelta(seconds=55))
+        test.create_event(self.swimmer, event='100 fly', time=timedelta(seconds=56))
+        with self.assertNumQueries(1):
+            swimmer_records = funct.get_swimmer_records(self.swimmer)
+            self.assertEqual(dict(swimmer_records)['100 Butterfly'].time, best.time)
+
+
+class TestBaseCache(TestCase):
+    def setUp(self):
+        self.user = test.create_user(username='user', password='password')
+        self.team = test.create_team(self.user)
+        self.swimmer = test.create_swimmer(self.team)
+        self.key = records.BASE_CACHE_KEY % self.team.id
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_get_team_bases(self):
+        """
+        Returns each swimmer's fastest base and 100 times and caches them for the
+        team.
+        """
+        other = test.create_swimmer(self.team, first='Jane', last='Doe', gender='F')
+        test.create_event(self.swimmer, 'base free', timedelta(seconds=26))
+        test.create_event(self.swimmer, 'base free', timedelta(seconds=25))
+        test.create_event(self.swimmer, '100 fly', timedelta(seconds=55))
+        test.create_event(self.swimmer, '200 fly', timedelta(seconds=125))
+        test.create_event(other, '100 back', timedelta(seconds=60))
+
+        bases = records.get_team_bases(self.team.id)
+        self.assertEqual(bases, {
+            self.swimmer.id: {'base free': timedelta(seconds=25), '100 fly': timedelta(seconds=55)},
+            other.id: {'100 back': timedelta(seconds=60)},
+        })
+        self.assertEqual(cache.get(self.key), bases)
+        self.assertEqual(self.swimmer.get_base('race', 'fly'), timedelta(seconds=27.5))
+
+    def test_base_cache_invalidation(self):
+        """
+        Saving or deleting a base or 100 time clears the team's cached bases, but
+        other events don't.
+        """
+        base = test.create_event(self.swimmer, 'base free', timedelta(seconds=25))
+        self.assertEqual(self.swimmer.get_base('train', 'free'), timedelta(seconds=25))
+
+        test.create_event(self.swimmer, '200 free', timedelta(seconds=115))
+        self.assertIsNotNone(cache.get(self.key))
+
+        test.create_event(self.swimmer, 'base free', timedelta(seconds=24))
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.swimmer.get_base('train', 'free'), timedelta(seconds=24))
+
+        Event.objects.get(time=timedelta(seconds=24)).delete()
+        self.assertEqual(self.swimmer.get_base('train', 'free'), timedelta(seconds=25))
+
+        records.rebuild_personal_bests([self.swimmer.id])
+        self.assertIsNone(cache.get(self.key))
+
+
+class TestTeamRecords(TestCase):
+    def setUp(self):
+        self.user = test.create_user(username='user', password='password')
+        self.team = test.create_team(self.user)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def test_get_team_bests(self):
+        """
+        Returns the team's fastest result for each event and gender, leaving out
+        results for other teams and records without a gender.
+        """
+        other_team = test.create_team(self.user, name='Other Team', abbr='OT')
+        men = test.create_record(team=self.team, event='50 free', time=timedelta(seconds=22.32))
+        test.create_record(team=self.team, event='50 free', time=timedelta(seconds=22.96))
+        women = test.create_record(team=self.team, name='Jane Doe', gender='F', event='50 free', time=timedelta(seconds=25.14))
+        fly = test.create_record(team=self.team, event='100 fly', time=timedelta(seconds=52))
+        test.create_record(team=other_team, event='50 free', time=timedelta(seconds=20))
+        test.create_record(team=self.team, gender=None, event='50 free', time=timedelta(seconds=21))
+
+        with self.assertNumQueries(1):
+            bests = records.get_team_bests(self.team)
+        self.assertEqual(bests, {
+            ('50 free', 'M'): men,
+            ('50 free', 'F'): women,
+            ('100 fly', 'M'): fly,
+        })
+        self.assertEqual(records.get_team_bests(self.team, events=['100 fly']), {('100 fly', 'M'): fly})
+
+    def test_team_records_query(self):
+        """
+        The records page's records are read in one query.
+        """
+        test.create_record(team=self.team, event='50 free')
+        with self.assertNumQueries(1):
+            team_records = funct.get_team_records(self.team)
+        self.assertEqual(len(team_records), 17)
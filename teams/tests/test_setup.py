@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import io, os, zipfile
 from datetime import date, timedelta
 
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 from teams.models import *
 
+TEST_CL2_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_files', 'CFILE01.CL2')
+
 def create_user(username, password):
     """
     Create a test user.
@@ -136,3 +140,14 @@ def create_training_multiplier(model, focus='warmup', multiplier=1):
     Create a test training multiplier.
     """
     return TrainingMultiplier.objects.create(training_model=model, focus=focus, multiplier=multiplier)
+
+def create_zip_file(name, files):
+    """
+    Create a test zip file upload containing the given {file name: contents}.
+    """
+    buf = io.BytesIO()
+    zip_ref = zipfile.ZipFile(buf, 'w')
+    for file_name, contents in files.items():
+        zip_ref.writestr(file_name, contents)
+    zip_ref.close()
+    return SimpleUploadedFile(name, buf.getvalue(), content_type='application/zip')
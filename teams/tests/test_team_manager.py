@@ -6,8 +6,10 @@ from datetime import date, timedelta
 from django.test import TestCase
 
 from teams.TeamManager import TeamManager
-from teams.models import Team, Event
+from teams.models import Team, Swimmer, Event
 import teams.tests.test_setup as test
+from teams import schedule
+from teams.tests.test_hytek import RESULTS
 
 class TestTeamManager(TestCase):
     def setUp(self):
@@ -97,11 +99,10 @@ class TestTeamManager(TestCase):
     def test_team_manager_init(self):
         """
         A TeamManager object takes a Team object and an optional zip file when
-        initialized. A user directory should also be created in tmp/.
+        initialized.
         """
         TeamManager(team=self.team)
         tm = TeamManager(team=self.team, zip_file='NUSC-NE-Roster003.zip')
-        self.assertTrue(os.path.isdir(tm.user_folder_path))
         self.assertEqual(tm.team, self.team)
         self.assertEqual(tm.zip_file, 'NUSC-NE-Roster003.zip')
 
@@ -224,3 +225,132 @@ class TestTeamManager(TestCase):
 
         events = Event.objects.all()
         self.assertEqual(len(events), 113)
+
+    def test_team_manager_parse_roster_bulk(self):
+        """
+        Parsing a roster creates any new swimmers, with ages, in bulk and doesn't
+        duplicate swimmers that already exist.
+        """
+        tm = TeamManager(team=self.team)
+        with open(test.TEST_CL2_FILE, 'r') as f:
+            tm.parse_roster(f, '.cl2')
+        self.assertEqual(tm.msg, [('success', 'Roster imported')])
+
+        new_swimmers = []
+        for swimmer in self.team.swimmer_set.all():
+            new_swimmers.append('<Swimmer: ' + swimmer.l_name + '>')
+        self.assertEqual(new_swimmers, self.swimmers)
+
+        swimmer = self.team.swimmer_set.get(l_name='Abel')
+        self.assertEqual(swimmer.birth_date, date(1996, 4, 23))
+        self.assertEqual(swimmer.age, int((date.today() - swimmer.birth_date).days / 365.2425))
+
+        tm = TeamManager(team=self.team)
+        with open(test.TEST_CL2_FILE, 'r') as f:
+            tm.parse_roster(f, '.cl2')
+        self.assertEqual(self.team.swimmer_set.count(), len(self.swimmers))
+
+    def test_team_manager_reconcile_roster(self):
+        """
+        Swimmers on the team that aren't in the new roster are deleted and a count
+        of added, kept, and removed swimmers is returned. Swimmers on other teams
+        are left alone. Schedules with removed swimmers are cleared.
+        """
+        other_team = test.create_team(self.user, name='Other Team', abbr='OT')
+        other_swimmer = test.create_swimmer(other_team, first='Jane', last='Doe', gender='F')
+        kept = test.create_swimmer(self.team, first='Casey', last='Abel', gender='F')
+        removed = test.create_swimmer(self.team, first='Jane', last='Doe', gender='F')
+        week = test.create_week()
+        test.create_set(test.create_practice(self.team, week), swimmers=[removed])
+        schedule.set_schedule(self.team, week, 'cached')
+
+        tm = TeamManager(team=self.team)
+        with open(test.TEST_CL2_FILE, 'r') as f:
+            diff = tm.parse_roster(f, '.cl2')
+
+        self.assertEqual(diff, {'added': 74, 'kept': 1, 'removed': 1})
+        self.assertTrue(Swimmer.objects.filter(pk=kept.pk).exists())
+        self.assertFalse(Swimmer.objects.filter(pk=removed.pk).exists())
+        self.assertTrue(Swimmer.objects.filter(pk=other_swimmer.pk).exists())
+        self.assertIsNone(schedule.get_schedule(self.team, week))
+
+    def test_team_manager_parse_results_bulk(self):
+        """
+        Parsing results creates events for the team's swimmers in bulk with the
+        name, gender, and team set, and doesn't duplicate results already saved.
+        """
+        swimmer = test.create_swimmer(team=self.team)
+        tm = TeamManager(team=self.team)
+        with self.assertNumQueries(12):
+            tm.parse_results(RESULTS)
+        self.assertEqual(tm.msg, [('success', 'Results imported')])
+
+        events = Event.objects.filter(swimmer=swimmer)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0].name, 'Henry Gridley')
+        self.assertEqual(events[0].gender, 'M')
+        self.assertEqual(events[0].team, self.team)
+        self.assertEqual(events[0].event, '50 breast')
+        self.assertEqual(events[0].time, timedelta(seconds=35.88))
+        self.assertEqual(events[0].place, 7)
+        self.assertEqual(events[0].date, date(2017,2,4))
+
+        tm = TeamManager(team=self.team)
+        tm.parse_results(RESULTS)
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_team_manager_load_roster_in_memory(self):
+        """
+        Roster files are read straight from the uploaded zip file, including zip
+        files with a __MACOSX/ folder.
+        """
+        zip_file = test.create_zip_file('NUSC-NE-Roster001.zip', {
+            'NUSC-NE-Roster001/CFILE01.CL2': open(test.TEST_CL2_FILE, 'rb').read(),
+            '__MACOSX/NUSC-NE-Roster001/._CFILE01.CL2': b'\x00\x05\x16\x07',
+        })
+        tm = TeamManager(team=self.team, zip_file=zip_file)
+        msg = tm.load_roster()
+        self.assertEqual(msg, [('success', 'Roster imported')])
+        self.assertEqual(self.team.swimmer_set.count(), 74)
+
+    def test_team_manager_load_results_in_memory(self):
+        """
+        Results files are read straight from the uploaded zip file.
+        """
+        swimmer = test.create_swimmer(team=self.team)
+        zip_file = test.create_zip_file('RED-NE-Results001.zip', {
+            'MEET.HY3': '\r\n'.join(RESULTS).encode('latin-1'),
+        })
+        tm = TeamManager(team=self.team, zip_file=zip_file)
+        msg = tm.load_results()
+        self.assertEqual(msg, [('success', 'Results imported')])
+        self.assertEqual(swimmer.event_set.count(), 2)
+
+        tm = TeamManager(team=self.team, zip_file=test.create_zip_file('RED-NE-Results002.zip', {}))
+        msg = tm.load_results()
+        self.assertEqual(msg, [('error', 'Couldn\'t find .HY3 file in zip file')])
+
+    def test_team_manager_load_batch(self):
+        """
+        Results from many meets, including a zip file of meets, are imported at
+        once and errors are reported for each meet that can't be read.
+        """
+        swimmer = test.create_swimmer(team=self.team)
+        meet1 = test.create_zip_file('Meet1-Results.zip', {'MEET.HY3': '\r\n'.join(RESULTS).encode('latin-1')})
+        meet2 = test.create_zip_file('Meet2-Results.zip', {
+            'MEET.HY3': '\r\n'.join(RESULTS).replace('0204201702042017', '0211201702112017').encode('latin-1'),
+        })
+        season = test.create_zip_file('Season.zip', {
+            'Meet1-Results.zip': meet1.read(),
+            'Meet2-Results.zip': meet2.read(),
+            'Meet3-Results.zip': test.create_zip_file('Meet3-Results.zip', {}).read(),
+        })
+
+        tm = TeamManager(team=self.team)
+        msg = tm.load_batch([season, meet1], workers=1)
+        self.assertEqual(msg, [
+            ('error', 'Couldn\'t find .HY3 file in Meet3-Results.zip'),
+            ('success', 'Results imported from 3 meet(s)'),
+        ])
+        self.assertEqual(swimmer.event_set.count(), 4)
+        self.assertEqual(sorted(set(swimmer.event_set.values_list('date', flat=True))), [date(2017,2,4), date(2017,2,11)])
@@ -9,6 +9,8 @@ from django.urls import reverse
 import teams.tests.test_setup as test
 from teams.models import *
 import teams.functions as funct
+import teams.jobs as jobs
+from teams.tests.test_hytek import RESULTS
 
 # Team list
 
@@ -383,6 +385,7 @@ class TestSwimmerListView(TestCase):
                 },
                 follow=True
             )
+            jobs.run_pending()
 
             swimmers = [
                 '<Swimmer: Abel>',
@@ -465,7 +468,8 @@ class TestSwimmerListView(TestCase):
                 new_swimmers.append('<Swimmer: ' + swimmer.l_name + '>')
             self.assertEqual(new_swimmers, swimmers)
             self.assertEqual(response.status_code, 200)
-            self.assertContains(response, 'Roster imported')
+            self.assertContains(response, 'importing NUSC-NE-Roster003.zip')
+            self.assertEqual(ImportJob.objects.get().get_messages(), [('success', 'Roster imported')])
 
     def test_roster_upload_error(self):
         """
@@ -484,9 +488,10 @@ class TestSwimmerListView(TestCase):
                 },
                 follow=True
             )
+            jobs.run_pending()
             self.assertQuerysetEqual(team.swimmer_set.all(), [])
             self.assertEqual(response.status_code, 200)
-            self.assertContains(response, 'Couldn&#39;t find .CL2 or .HY3 file in zip file')
+            self.assertEqual(ImportJob.objects.get().get_messages(), [('error', 'Couldn\'t find .CL2 or .HY3 file in zip file')])
 
     def test_roster_and_results_upload(self):
         """
@@ -505,8 +510,9 @@ class TestSwimmerListView(TestCase):
                 },
                 follow=True
             )
+            jobs.run_pending()
             self.assertEqual(response.status_code, 200)
-            self.assertContains(response, 'Roster imported')
+            self.assertEqual(ImportJob.objects.last().get_messages(), [('success', 'Roster imported')])
 
         with open('/Users/hgridley/Documents/Code/projects/CoachMate/teams/tests/test_files/RED-NE-Results005.zip', 'r') as f:
             response = self.client.post(reverse('teams:swimmerList', kwargs={
@@ -518,14 +524,101 @@ class TestSwimmerListView(TestCase):
                 },
                 follow=True
             )
+            jobs.run_pending()
             self.assertEqual(response.status_code, 200)
-            self.assertContains(response, 'Results imported')
+            self.assertEqual(ImportJob.objects.last().get_messages(), [('success', 'Results imported')])
 
         swimmers = Swimmer.objects.all()
         events = Event.objects.all()
         self.assertEqual(len(swimmers), 74)
         self.assertEqual(len(events), 113)
 
+    def test_upload_runs_in_background(self):
+        """
+        Uploads are queued as import jobs and the progress and messages of a job
+        can be checked while it runs.
+        """
+        self.client.login(username='user1', password='password')
+        team = test.create_team(self.user1)
+        zip_file = test.create_zip_file('NUSC-NE-Roster001.zip', {
+            'CFILE01.CL2': open(test.TEST_CL2_FILE, 'rb').read(),
+        })
+        response = self.client.post(reverse('teams:swimmerList', kwargs={
+                'abbr': team.abbr
+            }),
+            {
+                'zip_file': zip_file,
+                'upload': 'Submit'
+            },
+            follow=True
+        )
+        job = ImportJob.objects.get()
+        self.assertQuerysetEqual(team.swimmer_set.all(), [])
+        self.assertEqual(response.status_code, 200)
+        self.assertQuerysetEqual(response.context['import_jobs'], ['<ImportJob: NUSC-NE-Roster001.zip>'])
+
+        status_url = reverse('teams:importStatus', kwargs={'abbr': team.abbr, 'job_id': job.id})
+        response = self.client.get(status_url)
+        self.assertEqual(response.json(), {
+            'file_name': 'NUSC-NE-Roster001.zip',
+            'status': 'queued',
+            'progress': 0,
+            'messages': [],
+        })
+
+        jobs.run_pending()
+        response = self.client.get(status_url)
+        self.assertEqual(response.json(), {
+            'file_name': 'NUSC-NE-Roster001.zip',
+            'status': 'done',
+            'progress': 100,
+            'messages': [['success', 'Roster imported']],
+        })
+        self.assertEqual(team.swimmer_set.count(), 74)
+
+    def test_batch_upload(self):
+        """
+        Many results files are queued as one import job.
+        """
+        self.client.login(username='user1', password='password')
+        team = test.create_team(self.user1)
+        swimmer = test.create_swimmer(team=team)
+        meets = [
+            test.create_zip_file('Meet%d-Results.zip' % i, {
+                'MEET.HY3': '\r\n'.join(RESULTS).replace('02042017', '020%d2017' % i).encode('latin-1'),
+            }) for i in (4, 5)
+        ]
+        response = self.client.post(reverse('teams:swimmerList', kwargs={
+                'abbr': team.abbr
+            }),
+            {
+                'zip_files': meets,
+                'batch_upload': 'Submit'
+            },
+            follow=True
+        )
+        job = ImportJob.objects.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((job.kind, job.file_name), ('batch', '2 meets'))
+
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.get_messages(), [('success', 'Results imported from 2 meet(s)')])
+        self.assertEqual(swimmer.event_set.count(), 4)
+
+    def test_import_status_other_user(self):
+        """
+        Users can't see the import jobs of another user's team.
+        """
+        team = test.create_team(self.user2)
+        job = ImportJob.objects.create(team=team, kind='roster', file_name='Roster.zip')
+        self.client.login(username='user1', password='password')
+        response = self.client.get(reverse('teams:importStatus', kwargs={
+            'abbr': team.abbr,
+            'job_id': job.id
+        }))
+        self.assertEqual(response.status_code, 404)
+
     def test_invalid_file_upload(self):
         """
         An error message is displayed if the file is not named correctly.
@@ -573,6 +666,73 @@ class TestSwimmerDetailView(TestCase):
         self.assertEqual(response.context['swimmer'].l_name, 'Gridley')
         self.assertContains(response, 'Henry Gridley')
 
+    def test_swimmer_progress(self):
+        """
+        The progress chart is loaded as JSON, cached, and always revalidated
+        with the ETag of the swimmer's results, which is only looked up once
+        per request. Unknown events aren't found. Other users can't see a
+        swimmer's chart.
+        """
+        self.client.login(username='user', password='password')
+        swimmer = test.create_swimmer(self.team)
+        url = reverse('teams:swimmerProgress', kwargs={'abbr': self.team.abbr, 's_id': swimmer.id})
+        response = self.client.get(reverse('teams:swimmerDetail', kwargs={
+                'abbr': self.team.abbr,
+                's_id': swimmer.id,
+            })
+        )
+        self.assertContains(response, url)
+
+        response = self.client.get(url)
+        self.assertEqual(response.json(), {'script': None, 'div': None})
+        self.assertFalse(response.has_header('ETag'))
+
+        test.create_event(swimmer, '50 free', timedelta(seconds=25), date=date(2017, 1, 1))
+        test.create_event(swimmer, '50 free', timedelta(seconds=24), date=date(2017, 2, 1))
+        response = self.client.get(url)
+        self.assertIn('50 Freestyle', response.json()['script'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+
+        response = self.client.get(url, {'event': '50 free'})
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(url, {'event': 'x' * 300})
+        self.assertEqual(response.status_code, 404)
+
+        with self.assertNumQueries(6): # session, user, team, swimmer, version, and cached chart
+            response = self.client.get(url)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.assertNumQueries(5):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        test.create_event(swimmer, '100 free', timedelta(seconds=55), date=date(2016, 1, 1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        test.create_user('user2', 'password')
+        self.client.login(username='user2', password='password')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 404)
+
+    def test_chart_script(self):
+        """
+        The chart JavaScript is generated from the event choices and can be
+        cached by browsers.
+        """
+        response = self.client.get(reverse('teams:chartScript'))
+        self.assertEqual(response['Content-Type'], 'application/javascript')
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        for event, name in EVENT_CHOICE:
+            self.assertContains(response, '"%s": "%s"' % (event, name))
+
+        response = self.client.get(reverse('teams:chartScript'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
     def test_swimmer_edit(self):
         """
         Swimmers can be edited on their personal page.
@@ -1000,6 +1160,94 @@ class TestPracticeScheduleView(TestCase):
         self.assertContains(response, '7/16')
         self.assertContains(response, '00:55')
 
+    def test_schedule_jump_to_date(self):
+        """
+        Submitting a date redirects to the schedule for the week containing it.
+        """
+        self.client.login(username='user1', password='password')
+        team = test.create_team(user=self.user1)
+        week = test.create_week()
+        week.populate()
+        response = self.client.get(reverse('teams:practiceSchedule', kwargs={
+                'abbr': team.abbr,
+                'w_id': week.id,
+            }),
+            {'date': '2017-09-14'}
+        )
+        jump_week = Week.objects.get(monday=date(2017, 9, 11))
+        self.assertRedirects(response, reverse('teams:practiceSchedule', kwargs={
+            'abbr': team.abbr,
+            'w_id': jump_week.id,
+        }))
+        self.assertEqual(jump_week.sunday, date(2017, 9, 17))
+
+    def test_schedule_cache(self):
+        """
+        A week's schedule is cached after the first view and cleared when a
+        practice, set, rep, interval, set's swimmers, swimmer, or team change or
+        a swimmer is deleted.
+        """
+        self.client.login(username='user1', password='password')
+        week = test.create_week()
+        week.populate()
+        team = test.create_team(user=self.user1)
+        swimmer1 = test.create_swimmer(team)
+        swimmer2 = test.create_swimmer(team, first='Dave', last='Thornton')
+        practice = test.create_practice(team, week)
+        set1 = test.create_set(practice=practice, order=23, swimmers=[swimmer1])
+        rep = test.create_rep(set1, distance=150)
+        url = reverse('teams:practiceSchedule', kwargs={
+            'abbr': team.abbr,
+            'w_id': week.id,
+        })
+
+        def assertCached(cached):
+            response = self.client.get(url)
+            self.assertEqual('practices' not in response.context, cached)
+            return response
+
+        assertCached(False)
+        response = assertCached(True)
+        self.assertContains(response, '150')
+
+        rep.distance = 175
+        rep.save()
+        response = assertCached(False)
+        self.assertContains(response, '175')
+        self.assertNotContains(response, '150')
+
+        set1.swimmers.add(swimmer2)
+        response = assertCached(False)
+        self.assertContains(response, 'Thornton')
+
+        swimmer2.set_set.clear()
+        assertCached(False)
+
+        test.create_interval(swimmer1, rep, time=timedelta(seconds=95))
+        response = assertCached(False)
+        self.assertContains(response, '01:35')
+
+        test.create_set(practice=practice, focus='sprint', order=37)
+        assertCached(False)
+        test.create_practice(team, week, weekday='friday')
+        assertCached(False)
+        assertCached(True)
+
+        swimmer1.l_name = 'Smith'
+        swimmer1.save()
+        response = assertCached(False)
+        self.assertContains(response, 'Smith')
+
+        team.abbr = 'NEW'
+        team.save()
+        url = reverse('teams:practiceSchedule', kwargs={'abbr': 'NEW', 'w_id': week.id})
+        response = assertCached(False)
+        self.assertContains(response, '/teams/NEW/practice/%d/' % practice.id)
+
+        self.client.get(reverse('teams:deleteSwimmer', kwargs={'abbr': 'NEW', 's_id': swimmer1.id}))
+        response = assertCached(False)
+        self.assertNotContains(response, 'Smith')
+
     def test_multiple_users_with_practices(self):
         """
         Only practices belonging to the logged in user will be displayed.
@@ -1137,6 +1385,33 @@ class TestPracticeScheduleView(TestCase):
             'weekday': ['This field is required.'],
         })
 
+    def test_copy_weeks(self):
+        """
+        Copies the week's practices onto the week of a date and shows that week.
+        Other users can't copy a team's practices.
+        """
+        self.client.login(username='user1', password='password')
+        team = test.create_team(user=self.user1)
+        week = test.create_week(monday=date(2017, 7, 10))
+        test.create_set(test.create_practice(team, week, 'tuesday'))
+        url = reverse('teams:copyWeeks', kwargs={'abbr': team.abbr, 'w_id': week.id})
+
+        response = self.client.post(url, {'date': '2017-08-02', 'weeks': 1, 'repeats': 2}, follow=True)
+        target = Week.objects.get(monday=date(2017, 7, 31))
+        self.assertRedirects(response, reverse('teams:practiceSchedule', kwargs={
+            'abbr': team.abbr,
+            'w_id': target.id,
+        }))
+        self.assertContains(response, 'Copied 2 practice(s)')
+        self.assertEqual(Practice.objects.filter(weekday='tuesday').count(), 3)
+
+        response = self.client.post(url, {'date': '', 'weeks': 0, 'repeats': 1}, follow=True)
+        self.assertContains(response, 'Couldn&#39;t copy practices')
+
+        self.client.login(username='user2', password='password')
+        response = self.client.post(url, {'date': '2017-08-02', 'weeks': 1, 'repeats': 1})
+        self.assertEqual(response.status_code, 404)
+
 
 # Create training model
 
@@ -1257,6 +1532,48 @@ class TestShowTrainingView(TestCase):
         self.assertContains(response, 'Northeastern University')
         self.assertContains(response, 'Warmup')
 
+    def test_recalculate_intervals(self):
+        """
+        Recalculating intervals updates the team's intervals in the chosen date
+        range and shows a message. Ranges longer than a season are rejected.
+        Other users can't recalculate a team's intervals.
+        """
+        self.client.login(username='user1', password='password')
+        team = test.create_team(user=self.user1)
+        swimmer = test.create_swimmer(team)
+        test.create_event(swimmer, 'base free', timedelta(seconds=25))
+        practice = test.create_practice(team, test.create_week())
+        rep = test.create_rep(test.create_set(practice, swimmers=[swimmer]))
+        interval = test.create_interval(swimmer, rep, time=timedelta(seconds=90))
+        url = reverse('teams:recalculateIntervals', kwargs={'abbr': team.abbr})
+        monday = practice.week_id.monday
+        data = {'start': monday, 'end': monday + timedelta(days=6)}
+
+        response = self.client.post(url, data, follow=True)
+        self.assertContains(response, 'No training model')
+
+        training_model = test.create_training_model(team)
+        test.create_training_multiplier(training_model, multiplier=0.07)
+        response = self.client.post(url, {'start': monday + timedelta(days=1), 'end': data['end']}, follow=True)
+        self.assertContains(response, 'Recalculated intervals for 0 set(s)')
+        self.assertEqual(Interval.objects.get(rep=rep).time, timedelta(seconds=90))
+
+        for invalid in [{}, {'start': data['end'], 'end': monday}, {'start': monday, 'end': monday + timedelta(days=366)}]:
+            response = self.client.post(url, invalid, follow=True)
+            self.assertContains(response, 'Couldn&#39;t recalculate intervals')
+        self.assertEqual(Interval.objects.get(rep=rep).time, timedelta(seconds=90))
+
+        response = self.client.post(url, data, follow=True)
+        self.assertRedirects(response, reverse('teams:showTraining'))
+        self.assertContains(response, 'Recalculated intervals for 1 set(s)')
+        self.assertContains(response, 'name="start"')
+        self.assertEqual(Interval.objects.get(rep=rep).time, timedelta(seconds=55))
+
+        self.client.login(username='user2', password='password')
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 404)
+
+
 
 # Delete models
 
@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+import teams.tests.test_setup as test
+from teams.models import Week
+from teams import weeks
+
+class TestWeeks(TestCase):
+    def test_monday_of(self):
+        """
+        Returns the Monday of the week containing a date.
+        """
+        self.assertEqual(weeks.monday_of(date(2017, 7, 10)), date(2017, 7, 10))
+        self.assertEqual(weeks.monday_of(date(2017, 7, 16)), date(2017, 7, 10))
+        self.assertEqual(weeks.monday_of(date(2017, 1, 1)), date(2016, 12, 26))
+        self.assertEqual(weeks.mondays(date(2017, 7, 12), date(2017, 7, 25)),
+            [date(2017, 7, 10), date(2017, 7, 17), date(2017, 7, 24)])
+        self.assertEqual(weeks.mondays(date(2017, 7, 25), date(2017, 7, 12)), [])
+
+    def test_get_or_create_range(self):
+        """
+        Existing weeks are fetched and missing weeks are created in bulk with
+        every day filled in.
+        """
+        existing = test.create_week(monday=date(2017, 7, 17))
+        existing.populate()
+        test.create_week(monday=date(2017, 7, 17)) # duplicate, ignored
+
+        with self.assertNumQueries(3):
+            week_range = weeks.get_or_create_range(date(2017, 7, 12), date(2017, 7, 25))
+
+        self.assertEqual([w.monday for w in week_range],
+            [date(2017, 7, 10), date(2017, 7, 17), date(2017, 7, 24)])
+        self.assertEqual(week_range[1], existing)
+        self.assertEqual(list(week_range[0].date_range()),
+            [date(2017, 7, 10) + timedelta(days=n) for n in range(7)])
+        self.assertFalse(week_range[0].present)
+        self.assertEqual(Week.objects.count(), 4)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(weeks.get_or_create_range(date(2017, 7, 10), date(2017, 7, 30)), week_range)
+
+    def test_calendar_views(self):
+        """
+        Returns the week of a date and the weeks of a month or season.
+        """
+        self.assertEqual(weeks.get_week_for_date(date(2017, 7, 13)).monday, date(2017, 7, 10))
+
+        month = weeks.get_month(2017, 7)
+        self.assertEqual(month[0].monday, date(2017, 6, 26))
+        self.assertEqual(month[-1].monday, date(2017, 7, 31))
+        self.assertEqual(len(month), 6)
+
+        season = weeks.get_season(date(2018, 2, 1))
+        self.assertEqual(season[0].monday, date(2017, 8, 28))
+        self.assertEqual(season[-1].monday, date(2018, 8, 27))
+        self.assertEqual(weeks.get_season(date(2017, 9, 1))[0], season[0])
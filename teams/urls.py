@@ -7,6 +7,9 @@ urlpatterns = [
     # Dashboard
     url(r'^$', views.teamList, name='teamList'),
 
+    # Chart JavaScript
+    url(r'^charts\.js$', views.chartScript, name='chartScript'),
+
     # Training views
     url(r'^train/$', views.showTraining, name='showTraining'),
     url(r'^train/create/(?P<t_id>\d+)/$', views.createTraining, name='createTraining'),
@@ -15,9 +18,14 @@ urlpatterns = [
     # Team specific views
     url(r'^(?P<abbr>\w+)/$', views.swimmerList, name='swimmerList'),
     url(r'^(?P<abbr>\w+)/(?P<s_id>\d+)/$', views.swimmerDetail, name='swimmerDetail'),
+    url(r'^(?P<abbr>\w+)/(?P<s_id>\d+)/progress/$', views.swimmerProgress, name='swimmerProgress'),
     url(r'^(?P<abbr>\w+)/schedule/(?P<w_id>\d+)/$', views.practiceSchedule, name='practiceSchedule'),
     url(r'^(?P<abbr>\w+)/practice/(?P<p_id>\d+)/$', views.writePractice, name='writePractice'),
+    url(r'^(?P<abbr>\w+)/schedule/(?P<w_id>\d+)/copy/$', views.copyWeeks, name='copyWeeks'),
     url(r'^(?P<abbr>\w+)/records/$', views.teamRecords, name='teamRecords'),
+    url(r'^(?P<abbr>\w+)/analytics/$', views.teamAnalytics, name='teamAnalytics'),
+    url(r'^(?P<abbr>\w+)/import/(?P<job_id>\d+)/$', views.importStatus, name='importStatus'),
+    url(r'^(?P<abbr>\w+)/intervals/recalculate/$', views.recalculateIntervals, name='recalculateIntervals'),
 
     # Delete models
     url(r'^(?P<abbr>\w+)/team/delete/$', views.deleteTeam, name='deleteTeam'),
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 import logging
+from datetime import date, timedelta
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView
@@ -9,12 +10,22 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
 from django.contrib import messages
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 
 from teams.models import *
 from teams.forms import *
 import teams.functions as funct
-from teams.TeamManager import TeamManager
-from teams.graphs import graph_event
+import teams.cloning as cloning
+import teams.analytics as analytics
+import teams.jobs as jobs
+import teams.progress as progress
+import teams.schedule as schedule
+from teams.weeks import get_week_for_date, season_start
 from CoachMate.settings.base import DEBUG
 
 logger = logging.getLogger('CoachMate.prod') # Logger for production logging if necessary
@@ -57,6 +68,24 @@ def deleteTeam(request, abbr):
     return redirect('teams:teamList')
 
 
+# Team progress analytics
+@login_required
+def teamAnalytics(request, abbr):
+    team = get_object_or_404(Team, Q(user=request.user), abbr=abbr)
+    today = date.today()
+
+    context = {
+        'team': team,
+        'analytics': analytics.get_team_analytics(team, today),
+        'season_start': season_start(today),
+    }
+
+    if DEBUG == True:
+        return render(request, 'teams/team_analytics.html', context)
+    else:
+        return render(request, 'teams/team_analytics.min.html', context)
+
+
 # Team records
 @login_required
 def teamRecords(request, abbr):
@@ -105,6 +134,7 @@ def swimmerList(request, abbr):
             else:
                 team_form = TeamForm(instance=team)
                 upload_form = UploadZipForm()
+                batch_form = BatchUploadForm()
 
         elif 'team_edit' in request.POST:
             team_form = TeamForm(request.POST, instance=team, user=request.user)
@@ -114,42 +144,54 @@ def swimmerList(request, abbr):
             else:
                 swimmer_form = SwimmerForm()
                 upload_form = UploadZipForm()
+                batch_form = BatchUploadForm()
 
         # upload team rosters and meet results
         elif 'upload' in request.POST:
             upload_form = UploadZipForm(request.POST, request.FILES)
             if upload_form.is_valid():
                 zip_file = request.FILES['zip_file']
-                tm = TeamManager(team=team, zip_file=zip_file) # team manager object
-                # msgs contains error or success messages
-                if 'Roster' in zip_file.name:
-                    msgs = tm.load_roster()
-                elif 'Results' in zip_file.name:
-                    msgs = tm.load_results()
+                # imports are run by the worker so the request returns right away
+                if jobs.get_import_kind(zip_file.name):
+                    jobs.enqueue_import(team, zip_file)
+                    messages.info(request, 'Upload received - importing %s' % zip_file.name)
                 else:
-                    msgs = ('error', 'Invalid file')
-
-                for message in msgs:
-                    if message[0] == 'success':
-                        messages.success(request, message[1])
-                    else:
-                        messages.error(request, message[1])
+                    messages.error(request, 'Invalid file')
                 return redirect('teams:swimmerList', abbr=team.abbr)
             else:
                 team_form = TeamForm(instance=team)
                 swimmer_form = SwimmerForm()
+                batch_form = BatchUploadForm()
+
+        # upload a season of meet results at once
+        elif 'batch_upload' in request.POST:
+            batch_form = BatchUploadForm(request.POST, request.FILES)
+            if batch_form.is_valid():
+                zip_files = request.FILES.getlist('zip_files')
+                jobs.enqueue_batch(team, zip_files)
+                messages.info(request, 'Upload received - importing %d meet file(s)' % len(zip_files))
+                return redirect('teams:swimmerList', abbr=team.abbr)
+            else:
+                team_form = TeamForm(instance=team)
+                swimmer_form = SwimmerForm()
+                upload_form = UploadZipForm()
     else:
         swimmer_form = SwimmerForm()
         team_form = TeamForm(instance=team)
         upload_form = UploadZipForm()
+        batch_form = BatchUploadForm()
 
     swimmer_list  = Swimmer.objects.filter(team=team)
+    import_jobs = ImportJob.objects.filter(team=team).filter(
+        status__in=['queued', 'running']).defer('data')
     context = {
         'team': team,
         'team_form': team_form,
         'swimmer_list': swimmer_list,
         'swimmer_form': swimmer_form,
         'upload_form': upload_form,
+        'batch_form': batch_form,
+        'import_jobs': import_jobs,
     }
 
     if DEBUG == True:
@@ -158,6 +200,19 @@ def swimmerList(request, abbr):
         return render(request, 'teams/swimmer_list.min.html', context)
 
 
+# Progress of a Team Manager upload
+@login_required
+def importStatus(request, abbr, job_id):
+    team = get_object_or_404(Team, Q(user=request.user), abbr=abbr)
+    job = get_object_or_404(ImportJob.objects.defer('data'), Q(team=team), pk=job_id)
+    return JsonResponse({
+        'file_name': job.file_name,
+        'status': job.status,
+        'progress': job.progress,
+        'messages': job.get_messages(),
+    })
+
+
 # Individual swimmer pages
 @csrf_protect
 @login_required
@@ -191,7 +246,6 @@ def swimmerDetail(request, abbr, s_id):
         swimmer_form = SwimmerForm(instance=swimmer)
         event_form = EventForm(swimmer=swimmer)
 
-    script, div = graph_event(swimmer)
     records = funct.get_swimmer_records(swimmer)
 
     context =  {
@@ -199,8 +253,6 @@ def swimmerDetail(request, abbr, s_id):
         'swimmer': swimmer,
         'swimmer_form': swimmer_form,
         'event_form': event_form,
-        'script': script,
-        'div': div,
         'records': records,
     }
 
@@ -210,10 +262,39 @@ def swimmerDetail(request, abbr, s_id):
         return render(request, 'teams/swimmer_detail.min.html', context)
 
 
+# Event progress chart, loaded by the swimmer detail page. Browsers always
+# revalidate it against the version of the swimmer's results.
+@login_required
+@cache_control(private=True, no_cache=True)
+def swimmerProgress(request, abbr, s_id):
+    team = get_object_or_404(Team, Q(user=request.user), abbr=abbr)
+    swimmer = get_object_or_404(Swimmer, Q(team=team), pk=s_id)
+    event = request.GET.get('event')
+    if event and event not in dict(EVENT_CHOICE):
+        raise Http404('No such event')
+
+    version = progress.get_version(swimmer.id)
+    chart_etag = quote_etag(version) if version else None
+    response = get_conditional_response(request, etag=chart_etag)
+    if response is None:
+        response = JsonResponse(progress.get_chart(swimmer, event, version))
+        if chart_etag:
+            response['ETag'] = chart_etag
+    return response
+
+
+# Chart JavaScript shared by every progress chart
+@cache_control(public=True, max_age=60 * 60 * 24)
+@etag(lambda request: progress.CHART_SCRIPT_ETAG)
+def chartScript(request):
+    return HttpResponse(progress.CHART_SCRIPT, content_type='application/javascript')
+
+
 # Delete a swimmer
 @login_required
 def deleteSwimmer(request, abbr, s_id):
     swimmer = get_object_or_404(Swimmer, pk=s_id)
+    schedule.invalidate_practices(set__swimmers=swimmer)
     swimmer.delete()
     return redirect('teams:swimmerList', abbr=abbr)
 
@@ -306,6 +387,13 @@ def deletePractice(request, abbr, p_id):
 @login_required
 def practiceSchedule(request, abbr, w_id):
     team = get_object_or_404(Team, Q(user=request.user), abbr=abbr)
+
+    # jump to the week containing a date
+    jump_form = JumpToDateForm(request.GET or None)
+    if jump_form.is_valid():
+        week = get_week_for_date(jump_form.cleaned_data['date'])
+        return redirect('teams:practiceSchedule', abbr=team.abbr, w_id=week.id)
+
     weeks = funct.get_or_create_weeks(w_id)
 
     if request.method == 'POST':
@@ -324,13 +412,27 @@ def practiceSchedule(request, abbr, w_id):
     else:
         practice_form = PracticeForm()
 
-    practices, dates = funct.get_practices_and_dates(team, weeks)
+    # the week's practices are rendered once and cached until they change
+    week_schedule = schedule.get_schedule(team, weeks['current'])
+    if week_schedule is None:
+        practices, dates = funct.get_practices_and_dates(team, weeks)
+        week_context = {
+            'team': team,
+            'practices': practices,
+            'dates': dates,
+        }
+        if DEBUG == True:
+            week_schedule = render_to_string('teams/practice_week.html', week_context)
+        else:
+            week_schedule = render_to_string('teams/practice_week.min.html', week_context)
+        schedule.set_schedule(team, weeks['current'], week_schedule)
 
     context = {
         'team': team,
         'practice_form': practice_form,
-        'practices': practices,
-        'dates': dates,
+        'jump_form': jump_form,
+        'copy_form': CopyWeeksForm(),
+        'schedule': week_schedule,
     }
     context.update(weeks) # include 'weeks' dict in context
 
@@ -381,6 +483,42 @@ def deleteTraining(request, t_id):
     return redirect('teams:showTraining')
 
 
+@csrf_protect
+@login_required
+def copyWeeks(request, abbr, w_id):
+    team = get_object_or_404(Team, Q(user=request.user), abbr=abbr)
+    week = get_object_or_404(Week, pk=w_id)
+    if request.method == 'POST':
+        copy_form = CopyWeeksForm(request.POST)
+        if copy_form.is_valid():
+            end = week.monday + timedelta(weeks=copy_form.cleaned_data['weeks'] - 1)
+            practices = cloning.clone_cycle(team, week.monday, end, copy_form.cleaned_data['date'],
+                repeats=copy_form.cleaned_data['repeats'])
+            messages.success(request, 'Copied %d practice(s)' % len(practices))
+            target = get_week_for_date(copy_form.cleaned_data['date'])
+            return redirect('teams:practiceSchedule', abbr=team.abbr, w_id=target.id)
+        messages.error(request, 'Couldn\'t copy practices - check the date and number of weeks')
+    return redirect('teams:practiceSchedule', abbr=team.abbr, w_id=week.id)
+
+
+@csrf_protect
+@login_required
+def recalculateIntervals(request, abbr):
+    team = get_object_or_404(Team, Q(user=request.user), abbr=abbr)
+    if request.method == 'POST':
+        recalculate_form = RecalculateIntervalsForm(request.POST)
+        if recalculate_form.is_valid():
+            count = funct.recalculate_intervals(team, recalculate_form.cleaned_data['start'],
+                recalculate_form.cleaned_data['end'])
+            if count is None:
+                messages.error(request, 'No training model - Couldn\'t calculate intervals')
+            else:
+                messages.success(request, 'Recalculated intervals for %d set(s) - %s' % (count, team.name))
+        else:
+            messages.error(request, 'Couldn\'t recalculate intervals - check the dates, at most a season at a time')
+    return redirect('teams:showTraining')
+
+
 @csrf_protect
 @login_required
 def showTraining(request):
@@ -396,8 +534,16 @@ def showTraining(request):
 
     teams = zip(teams, models)
 
+    # recalculating defaults to the current season
+    start = season_start(date.today())
+    recalculate_form = RecalculateIntervalsForm(initial={
+        'start': start,
+        'end': date(start.year + 1, start.month, 1) - timedelta(days=1),
+    })
+
     context = {
         'teams': teams,
+        'recalculate_form': recalculate_form,
     }
 
     if DEBUG == True:
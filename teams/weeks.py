@@ -0,0 +1,100 @@
+"""
+Calendar of practice weeks.
+
+Every Week starts on a Monday and holds the dates of its seven days. Mondays are
+found with date arithmetic and any range of weeks, like a month or a whole
+season, is fetched with one query and the missing weeks created with one bulk
+insert, already populated.
+"""
+import calendar
+from datetime import date, timedelta
+
+from teams.models import Week
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+SEASON_START_MONTH = 9 # seasons start in September
+
+def monday_of(day):
+    """
+    Returns the Monday of the week containing the given date.
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def mondays(start, end):
+    """
+    Returns a list of the Mondays of each week from the week containing start
+    through the week containing end.
+    """
+    first = monday_of(start)
+    count = (monday_of(end) - first).days // 7 + 1
+    return [first + timedelta(weeks=n) for n in range(max(count, 0))]
+
+
+def build_week(monday, present=False):
+    """
+    Returns an unsaved Week starting on the given Monday with every day filled
+    in.
+    """
+    week = Week(monday=monday, present=present)
+    for n, weekday in enumerate(WEEKDAYS[1:], 1):
+        setattr(week, weekday, monday + timedelta(days=n))
+    return week
+
+
+def get_or_create_range(start, end):
+    """
+    Returns a list of the weeks from the week containing start through the week
+    containing end in order, creating any that don't exist yet in bulk. If there
+    is more than one week for a Monday the oldest is used.
+    """
+    week_mondays = mondays(start, end)
+    if not week_mondays:
+        return []
+
+    def fetch():
+        weeks = {}
+        for week in Week.objects.filter(monday__range=(week_mondays[0], week_mondays[-1])).order_by('-id'):
+            weeks[week.monday] = week
+        return weeks
+
+    weeks = fetch()
+    missing = [build_week(monday) for monday in week_mondays if monday not in weeks]
+    if missing:
+        Week.objects.bulk_create(missing)
+        weeks = fetch() # bulk_create doesn't set ids on every database
+
+    return [weeks[monday] for monday in week_mondays]
+
+
+def get_week_for_date(day):
+    """
+    Returns the week containing the given date, creating it if needed.
+    """
+    return get_or_create_range(day, day)[0]
+
+
+def get_month(year, month):
+    """
+    Returns the weeks with at least one day in the given month.
+    """
+    last_day = calendar.monthrange(year, month)[1]
+    return get_or_create_range(date(year, month, 1), date(year, month, last_day))
+
+
+def season_start(day, start_month=SEASON_START_MONTH):
+    """
+    Returns the first day of the season containing the given date. Seasons run
+    for a year from the first of start_month.
+    """
+    year = day.year if day.month >= start_month else day.year - 1
+    return date(year, start_month, 1)
+
+
+def get_season(day, start_month=SEASON_START_MONTH):
+    """
+    Returns every week of the season containing the given date.
+    """
+    start = season_start(day, start_month)
+    end = date(start.year + 1, start_month, 1) - timedelta(days=1)
+    return get_or_create_range(start, end)